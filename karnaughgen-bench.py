@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+
+# Copyright (c) 2013, Linus Karlsson
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#  * Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+#  * Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+#  * Neither the name of Linus Karlsson nor the names of the contributors may
+#    be used to endorse or promote products derived from this software without
+#    specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF
+# THE POSSIBILITY OF SUCH DAMAGE.
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import timeit
+
+import karnaughgen
+
+DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+
+def all_cubes(variables):
+    return [''.join(p) for p in itertools.product('01B', repeat=variables)]
+
+
+def random_values(count, variables, alphabet, seed=0):
+    rng = random.Random(seed)
+    return [''.join(rng.choice(alphabet) for _ in range(2 ** variables))
+            for _ in range(count)]
+
+
+def bench_generate_cube():
+    cubes = [c for n in (2, 3, 4) for c in all_cubes(n)]
+    generate_cube = karnaughgen.LaTeXGenerator.generate_cube
+
+    def run():
+        for c in cubes:
+            generate_cube(c)
+    return run
+
+
+def bench_generate(variables):
+    def setup():
+        cubes = all_cubes(variables)
+        values = '0' * 2 ** variables
+        generate = karnaughgen.LaTeXGenerator.generate
+        return lambda: generate(cubes, values)
+    return setup
+
+
+def bench_minimize(alphabet):
+    def setup():
+        functions = random_values(100, 4, alphabet)
+        minimize = karnaughgen.Minimizer.minimize
+
+        def run():
+            for values in functions:
+                minimize(values)
+        return run
+    return setup
+
+
+def bench_batch():
+    jobs = [json.dumps({'values': v, 'minimize': True})
+            for v in random_values(1000, 4, '01-')]
+    lines = list(enumerate(jobs, 1))
+
+    def run():
+        for _ in karnaughgen.BatchRenderer.run(lines):
+            pass
+    return run
+
+
+def bench_cli():
+    cmd = [sys.executable, os.path.join(DIRECTORY, 'karnaughgen-cli.py'),
+           '-v=-1-11-1-00000001', '0BBB', 'B111']
+    return lambda: subprocess.check_call(cmd, stdout=subprocess.DEVNULL)
+
+
+def bench_selection_to_cube():
+    # The cells of the selection of each cube, as in KarnaughMap.
+    layout = karnaughgen.MapLayout(4)
+    cells = {m: divmod(i, layout.columns)
+             for i, m in enumerate(layout.minterms)}
+    selections = [[cells[m] for m in karnaughgen.Cube.parse(c).minterms()]
+                  for c in all_cubes(4)]
+    from_mask = karnaughgen.Cube.from_mask
+
+    def run():
+        for selection in selections:
+            from_mask(4, layout.mask(selection))
+    return run
+
+
+def bench_map_values():
+    cells = karnaughgen.MapValues(4)
+    for row in range(4):
+        cells.set(row, row, '1')
+    return cells.values
+
+
+def bench_map_set():
+    cells = karnaughgen.MapValues(4)
+    sweep = [(row, column) for row in range(4) for column in range(4)]
+    toggle = itertools.cycle('10')
+
+    def run():
+        value = next(toggle)
+        for row, column in sweep:
+            cells.set(row, column, value)
+    return run
+
+
+# Name, setup returning the function to time, operations per call, and the
+# number of calls per timing. The result is the time per operation.
+BENCHMARKS = [
+    ('generate_cube', bench_generate_cube, 117, 200),
+    ('generate_2var', bench_generate(2), 1, 2000),
+    ('generate_3var', bench_generate(3), 1, 1000),
+    ('generate_4var', bench_generate(4), 1, 500),
+    ('minimize_4var', bench_minimize('01-'), 100, 5),
+    ('minimize_4var_table', bench_minimize('01'), 100, 50),
+    ('batch', bench_batch, 1000, 1),
+    ('cli', bench_cli, 1, 3),
+    ('gui_selection_to_cube', bench_selection_to_cube, 81, 50),
+    ('gui_map_values', bench_map_values, 1, 5000),
+    ('gui_map_set', bench_map_set, 16, 500),
+]
+
+
+def run(names=None, repeat=5):
+    """Runs the benchmarks and returns the results as a dict."""
+    results = {}
+    for name, setup, ops, number in BENCHMARKS:
+        if names and name not in names:
+            continue
+        timer = timeit.Timer(setup())
+        best = min(timer.repeat(repeat=repeat, number=number))
+        results[name] = {'seconds': best / (number * ops)}
+    return {'python': platform.python_version(),
+            'version': karnaughgen.__version__,
+            'results': results}
+
+
+def compare(baseline, current, threshold):
+    """Prints a comparison and returns the names of regressed benchmarks."""
+    regressions = []
+    print('{:<24} {:>12} {:>12} {:>7}'.format('benchmark', 'baseline',
+                                              'current', 'ratio'))
+    for name, result in sorted(current['results'].items()):
+        old = baseline['results'].get(name)
+        if old is None:
+            print('{:<24} {:>12} {:>12.3g}'.format(name, '-',
+                                                  result['seconds']))
+            continue
+        ratio = result['seconds'] / old['seconds']
+        flag = ''
+        if ratio > 1 + threshold:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print('{:<24} {:>12.3g} {:>12.3g} {:>7.2f}{}'.format(
+            name, old['seconds'], result['seconds'], ratio, flag))
+    return regressions
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description='Benchmarks the generator, minimizer, CLI, batch mode '
+        'and GUI logic. Times are seconds per operation.')
+    subparsers = parser.add_subparsers(dest='command')
+    run_parser = subparsers.add_parser('run', help='Run the benchmarks.')
+    run_parser.add_argument('-o', '--output',
+                            help='Save the results as JSON to OUTPUT.')
+    compare_parser = subparsers.add_parser(
+        'compare', help='Compare results against a baseline and exit with '
+        'status 1 if any benchmark regressed.')
+    compare_parser.add_argument('baseline', help='The baseline JSON file.')
+    compare_parser.add_argument('current', nargs='?',
+                                help='The JSON file to compare. By default '
+                                'the benchmarks are run.')
+    compare_parser.add_argument('-t', '--threshold', type=float, default=0.25,
+                                help='The slowdown relative to the baseline '
+                                'counted as a regression. Defaults to '
+                                '%(default)s.')
+    for p in (run_parser, compare_parser):
+        p.add_argument('-b', '--benchmark', action='append',
+                       choices=[b[0] for b in BENCHMARKS],
+                       help='Only run the given benchmark. Can be repeated.')
+    args = parser.parse_args()
+    if args.command is None:
+        parser.error('a command is required.')
+    return args
+
+
+def main():
+    args = parse_arguments()
+    if args.command == 'run':
+        results = run(args.benchmark)
+        text = json.dumps(results, indent=2, sort_keys=True)
+        if args.output is not None:
+            with open(args.output, 'w') as f:
+                f.write(text + '\n')
+        print(text)
+    else:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if args.current is not None:
+            with open(args.current) as f:
+                current = json.load(f)
+        else:
+            current = run(args.benchmark)
+        if compare(baseline, current, args.threshold):
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+
+# Copyright (c) 2013, Linus Karlsson
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#  * Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+#  * Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+#  * Neither the name of Linus Karlsson nor the names of the contributors may
+#    be used to endorse or promote products derived from this software without
+#    specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF
+# THE POSSIBILITY OF SUCH DAMAGE.
+
+import argparse
+import multiprocessing
+import os
+
+import karnaughgen
+
+CoverTable = karnaughgen.CoverTable
+Minimizer = karnaughgen.Minimizer
+
+
+def build_records(start, stop):
+    """Return the concatenated records of the functions in [start, stop)."""
+    variables = CoverTable.VARIABLES
+    minterms = range(2 ** variables)
+    records = []
+    for index in range(start, stop):
+        ones = [m for m in minterms if index >> m & 1]
+        primes = Minimizer.prime_implicants(variables, ones)
+        records.append(CoverTable.encode(Minimizer.minimal_cover(primes,
+                                                                 ones)))
+    return b''.join(records)
+
+
+def build_records_star(args):
+    return build_records(*args)
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description='Generates the minimal cover table of all fully '
+        'specified 4-variable functions, used by the minimizer.')
+    parser.add_argument('-o', '--output', default=CoverTable.PATH,
+                        help='The table file to write. Defaults to '
+                        '%(default)s.')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='The number of worker processes. Defaults to '
+                        'the number of CPUs.')
+    parser.add_argument('--batch', type=int, default=1024,
+                        help='The number of functions computed per batch. '
+                        'Defaults to %(default)s.')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    size = 2 ** 2 ** CoverTable.VARIABLES
+    batches = [(i, min(i + args.batch, size))
+               for i in range(0, size, args.batch)]
+    tmp = args.output + '.tmp'
+    pool = multiprocessing.Pool(args.jobs)
+    try:
+        with open(tmp, 'wb') as f:
+            f.write(CoverTable.HEADER.pack(CoverTable.MAGIC,
+                                           CoverTable.VERSION,
+                                           CoverTable.RECORD_SIZE, size))
+            # imap keeps the batches in order, so records can be written as
+            # soon as they arrive.
+            for records in pool.imap(build_records_star, batches):
+                f.write(records)
+    finally:
+        pool.close()
+        pool.join()
+    os.replace(tmp, args.output)
+
+if __name__ == '__main__':
+    main()
@@ -29,42 +29,278 @@
 # ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF
 # THE POSSIBILITY OF SUCH DAMAGE.
 
-import argparse
-import re
+# argparse and json are imported where needed, since the common case of
+# rendering a single map is handled by fast_parse and should start quickly.
+import sys
 
 import karnaughgen
 
 
+class FastArguments(object):
+    """The arguments parsed by fast_parse, with the defaults of argparse."""
+
+    cache_dir = None
+    batch = None
+    pla = None
+    format = 'latex'
+    verify = False
+    stats = False
+
+    def __init__(self, values, cubes, minimize):
+        self.values = values
+        self.cubes = cubes
+        self.minimize = minimize
+
+
+def fast_parse(argv):
+    """Parses the common forms of the arguments without using argparse.
+
+    Handles cubes together with the -v, -m and --stats options. Returns None
+    for any other option or for invalid arguments, which must then be handled
+    by parse_arguments, e.g. to show help or an error.
+    """
+    values, cubes, minimize, stats = None, [], False, False
+    # argparse only accepts cubes as one group of consecutive arguments.
+    cubes_done = False
+    args = iter(argv)
+    for arg in args:
+        if arg in ('-v', '--values'):
+            values = next(args, None)
+            if values is None or values.startswith('-'):
+                return None
+        elif arg.startswith('--values='):
+            values = arg[len('--values='):]
+        elif arg.startswith('-v'):
+            values = arg[2:]
+            if values.startswith('='):
+                values = values[1:]
+        elif arg in ('-m', '--minimize'):
+            minimize = True
+        elif arg == '--stats':
+            stats = True
+        elif arg.startswith('-'):
+            return None
+        else:
+            if cubes_done:
+                return None
+            try:
+                cubes.append(karnaughgen.Cube.parse(arg))
+            except karnaughgen.KarnaughError:
+                return None
+            continue
+        cubes_done = len(cubes) > 0
+    if minimize:
+        if cubes or values is None:
+            return None
+    elif not cubes or len({len(c) for c in cubes}) != 1:
+        return None
+    else:
+        if values is None:
+            values = '0' * (2 ** len(cubes[0]))
+        if 2 ** len(cubes[0]) != len(values):
+            return None
+    args = FastArguments(values, cubes, minimize)
+    args.stats = stats
+    return args
+
+
 def cube_parse(s):
     """Takes an input string and ensures that it is a valid cube."""
-    if re.match('^[01B]{2,4}$', s) is not None:
-        return s
-    else:
-        raise argparse.ArgumentTypeError('{} is not a valid cube'.format(s))
+    import argparse
+    try:
+        return karnaughgen.Cube.parse(s)
+    except karnaughgen.KarnaughError as e:
+        raise argparse.ArgumentTypeError(str(e))
 
 
 def parse_arguments():
-    """Parses arguments and return a tuple of (function values, cubes)."""
+    """Parses arguments and return the parsed namespace.
+
+    The values attribute of the namespace is always set, and the cubes
+    attribute is an empty list if --minimize is used.
+    """
+    import argparse
     parser = argparse.ArgumentParser(
         description='Generates LaTeX code for Karnaugh maps.',
         formatter_class=argparse.RawDescriptionHelpFormatter,
         epilog='examples:\n'
         '  %(prog)s B001\n'
-        '  %(prog)s -v=-1-11-1-00000001 0BBB B111')
+        '  %(prog)s -v=-1-11-1-00000001 0BBB B111\n'
+        '  %(prog)s --values-hex 805a --dc-hex 00a5 0BBB B111\n'
+        "  %(prog)s --expr \"x1 x2' + x3 (x4 + x1')\" --minimize\n"
+        '  %(prog)s --minimize -v=-1-11-1-00000001')
     parser.add_argument('-v', '--values', action='store',
                         help='The values of the function f. Expected input is '
-                        'a string of length 4, 8, or 16, corresponding to the '
-                        'number of variables (2, 3, or 4). The function values'
-                        ' should be in natural order. Defaults to all zero. '
+                        'a string of length 4, 8, 16, 32 or 64, corresponding '
+                        'to the number of variables (2 to 6). The function '
+                        'values should be in natural order. Defaults to all '
+                        'zero. Maps of 5 and 6 variables are drawn as 4 '
+                        'variable maps for each value of x1 (and x2). '
                         "To pass don't care terms, use the syntax "
                         '--values=-1-1 (note the equal sign (=)) to avoid '
                         'the parser to interpret it as an option.')
-    parser.add_argument('cubes', metavar='CUBE', type=cube_parse, nargs='+',
+    parser.add_argument('--values-hex', metavar='HEX',
+                        help='The values of the function f as a hex number, '
+                        'where bit m is set if f is 1 for minterm m, '
+                        'instead of --values. The number of digits (1, 2, 4, '
+                        '8 or 16) gives the number of variables, e.g. 805a '
+                        'for 4 variables.')
+    parser.add_argument('--dc-hex', metavar='HEX',
+                        help="The don't care terms of f as a hex number with "
+                        'the same number of digits as --values-hex.')
+    parser.add_argument('-e', '--expr', metavar='EXPR',
+                        help='The function f as a Boolean expression of the '
+                        "variables x1 to x6, instead of --values, e.g. \"x1 "
+                        "x2' + x3 (x4 + x1')\". Products are juxtaposed or "
+                        "joined by *, sums joined by +, and ' or a leading ~ "
+                        'complements. The number of variables is that of '
+                        'the cubes, or the highest variable used.')
+    parser.add_argument('-m', '--minimize', action='store_true',
+                        help='Compute a minimal cover of the function values '
+                        'and use its cubes as implicants, instead of passing '
+                        'the cubes on the command line. Requires --values. '
+                        'In batch mode, applies to jobs without cubes.')
+    parser.add_argument('-f', '--format', choices=['latex', 'svg'],
+                        default='latex',
+                        help='Output LaTeX code, or a standalone SVG image '
+                        'for previews. Defaults to %(default)s.')
+    parser.add_argument('--verify', action='store_true',
+                        help='Check that the cubes cover the ones of the '
+                        'function and no zeros, and report uncovered '
+                        'minterms, redundant and non-prime cubes and whether '
+                        'the cover is minimal, instead of generating code. '
+                        'Exits with status 1 if the cover is wrong. In batch '
+                        'mode, adds the report to each JSON result.')
+    parser.add_argument('--stats', action='store_true',
+                        help='Write the call count, total time and latency '
+                        'percentiles of each phase of generating code, and '
+                        'the number of maps per second, to stderr at exit. '
+                        'Phases in worker processes (--jobs) are not '
+                        'included.')
+    parser.add_argument('--cache-dir', metavar='DIR',
+                        help='Store generated code in DIR and reuse it when '
+                        'the same map is generated again.')
+    parser.add_argument('--batch', metavar='FILE',
+                        help='Render one map per line of FILE (or standard '
+                        'input if FILE is -) and write one JSON result per '
+                        'line. Jobs are JSON objects with the keys values '
+                        '(or expr), cubes, minimize and id, or CSV rows of '
+                        'values and space separated cubes.')
+    parser.add_argument('--pla', metavar='FILE',
+                        help='Render one map per output of the Berkeley PLA '
+                        'FILE (or standard input if FILE is -) of 2 to 6 '
+                        'inputs, with the terms of the output as cubes, or '
+                        'a minimal cover with --minimize. Results are '
+                        'written as with --batch-output, using the output '
+                        'name as id and caption.')
+    parser.add_argument('--outputs', metavar='NAMES',
+                        help='A comma separated list of the outputs to '
+                        'render with --pla. Defaults to all outputs.')
+    parser.add_argument('--map-inputs', metavar='INPUTS',
+                        help='With --pla, draw a 4-variable submap of each '
+                        'output over the four comma separated INPUTS, given '
+                        'as x1, x2, ... or by their .ilb names, for the '
+                        'values of the other inputs given by --assign. '
+                        'Required for files of more than 6 inputs. '
+                        'With --minimize, the outputs are minimized '
+                        'heuristically before the submaps are drawn, for '
+                        'files of up to 12 inputs.')
+    parser.add_argument('--assign', metavar='VALUES',
+                        help='The comma separated values of all inputs '
+                        'not in --map-inputs, e.g. x1=0,x2=1.')
+    parser.add_argument('--shared', action='store_true',
+                        help='Minimize the outputs of --pla together, '
+                        'choosing for each output the minimal cover that '
+                        'shares the most implicants with the other outputs, '
+                        'using --jobs worker processes. Shared implicants '
+                        'are drawn with thick lines and listed in the JSON '
+                        'results.')
+    parser.add_argument('--batch-format', choices=['auto', 'jsonl', 'csv'],
+                        default='auto',
+                        help='The format of the batch file. By default CSV '
+                        'is used for files ending in .csv, otherwise JSONL.')
+    parser.add_argument('--batch-output', choices=['jsonl', 'raw', 'document'],
+                        default='jsonl',
+                        help='Write batch results as JSON lines, raw as '
+                        'the code of each map followed by an empty line, '
+                        'with errors written to stderr, or as one LaTeX '
+                        'document with all maps in a grid, using the caption '
+                        'and label of each job. Defaults to %(default)s.')
+    parser.add_argument('--columns', type=int, default=2,
+                        help='The number of maps per row of a document. '
+                        'Defaults to %(default)s.')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='The number of worker processes used in batch '
+                        'mode. Defaults to 1.')
+    parser.add_argument('--unordered', action='store_true',
+                        help='Write batch results as soon as they are ready '
+                        'instead of in input order.')
+    parser.add_argument('cubes', metavar='CUBE', type=cube_parse, nargs='*',
                         help='A space-separated list of cubes for each '
                         'implicant that should be included in the output. '
-                        'A cube is a string of 2-4 chars from the set '
-                        '{0, 1, B}. Examples: 0B01, BB10, B10, 0B.')
+                        'A cube is a string of 2-6 chars from the set '
+                        '{0, 1, B}. Examples: 0B01, BB10, B10, 0B, 1B0B1.')
     args = parser.parse_args()
+    if args.jobs < 1:
+        parser.error('--jobs must be at least 1.')
+    if args.values_hex is not None:
+        if args.values is not None:
+            parser.error('--values and --values-hex cannot be combined.')
+        try:
+            args.values = karnaughgen.TruthTable.from_hex(args.values_hex,
+                                                          args.dc_hex)
+        except karnaughgen.KarnaughError as e:
+            parser.error(str(e))
+    elif args.dc_hex is not None:
+        parser.error('--dc-hex requires --values-hex.')
+    if args.expr is not None:
+        if args.values is not None:
+            parser.error('--expr cannot be combined with other values.')
+        variables = len(args.cubes[0]) if args.cubes else None
+        try:
+            args.values = karnaughgen.Expression.parse(args.expr).table(
+                variables)
+        except karnaughgen.KarnaughError as e:
+            parser.error(str(e))
+    if args.batch is not None:
+        if args.cubes or args.values is not None:
+            parser.error('cubes and values cannot be given with --batch.')
+        if args.format != 'latex':
+            parser.error('--batch only supports LaTeX output.')
+        if args.verify and args.batch_output != 'jsonl':
+            parser.error('--verify requires JSONL batch output.')
+        if args.batch_output == 'document' and args.unordered:
+            parser.error('--unordered cannot be used for a document.')
+        if args.columns < 1:
+            parser.error('--columns must be at least 1.')
+        if args.batch_format == 'auto':
+            csv = args.batch.lower().endswith('.csv')
+            args.batch_format = 'csv' if csv else 'jsonl'
+        return args
+    if args.pla is not None:
+        if args.cubes or args.values is not None:
+            parser.error('cubes and values cannot be given with --pla.')
+        if args.format != 'latex' or args.verify:
+            parser.error('--pla only supports LaTeX output.')
+        if (args.map_inputs is None) != (args.assign is None):
+            parser.error('--map-inputs and --assign must be given together.')
+        if args.map_inputs is not None and args.shared:
+            parser.error('--shared cannot be used with --map-inputs.')
+        if args.columns < 1:
+            parser.error('--columns must be at least 1.')
+        return args
+    if args.outputs is not None or args.shared or \
+            args.map_inputs is not None or args.assign is not None:
+        parser.error('--outputs, --map-inputs, --assign and --shared '
+                     'require --pla.')
+    if args.minimize:
+        if args.cubes:
+            parser.error('cubes cannot be given together with --minimize.')
+        if args.values is None:
+            parser.error('--minimize requires function values.')
+        return args
+    if not args.cubes:
+        parser.error('at least one cube is required.')
     # Now, ensure that the number of variables in all cubes match.
     if len({len(c) for c in args.cubes}) != 1:
         parser.error('all cubes must contain the same variable count.')
@@ -72,18 +308,179 @@ def parse_arguments():
     # Also ensure that the length of the (optional) values string matches the
     # variable count of the cubes.
     default_values = '0' * (2**variables)
-    values = args.values if args.values is not None else default_values
-    if 2 ** variables != len(values):
+    if args.values is None:
+        args.values = default_values
+    if 2 ** variables != len(args.values):
         parser.error("function values length must match cube's variable count")
     # Alles gut.
-    return values, args.cubes
+    return args
+
+
+def batch(args):
+    """Renders all jobs of the batch file.
+
+    Writes one JSON result line per job, or with --batch-output=raw the code
+    of each map followed by an empty line, with errors written to stderr.
+    With --batch-output=document a single document of all maps is written.
+    """
+    renderer = karnaughgen.BatchRenderer
+    try:
+        f = sys.stdin if args.batch == '-' else open(args.batch)
+    except IOError as e:
+        sys.exit('error: {}'.format(e))
+    try:
+        lines = renderer.read(f, args.batch_format)
+        if args.batch_output == 'raw' and args.jobs <= 1:
+            # Stream the code of each map directly to stdout.
+            for number, line in lines:
+                result = renderer.render(number, line, args.batch_format,
+                                         args.minimize, sys.stdout)
+                report_raw(result)
+            return
+        results = renderer.run(lines, args.batch_format, args.minimize,
+                               args.jobs, not args.unordered,
+                               verify=args.verify)
+        write_results(args, results)
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def pla(args):
+    """Renders one map per selected output of the PLA file, written like
+    batch results."""
+    f = sys.stdin if args.pla == '-' else args.pla
+    outputs = args.outputs.split(',') if args.outputs else None
+    try:
+        function = karnaughgen.PLA.read(f)
+    except (IOError, karnaughgen.KarnaughError) as e:
+        sys.exit('error: {}'.format(e))
+    try:
+        if args.shared:
+            results = shared_results(function, outputs, args.jobs)
+        else:
+            if args.map_inputs is not None:
+                assignment = {}
+                for item in args.assign.split(','):
+                    name, _, bit = item.partition('=')
+                    assignment[name.strip()] = bit.strip()
+                maps = function.submaps(args.map_inputs.split(','),
+                                        assignment, outputs, args.minimize)
+            else:
+                maps = function.maps(outputs, args.minimize)
+            results = ({'id': name, 'caption': name.replace('_', r'\_'),
+                        'latex': karnaughgen.LaTeXGenerator.generate(cubes,
+                                                                     values)}
+                       for name, cubes, values in maps)
+        write_results(args, results)
+    except karnaughgen.KarnaughError as e:
+        sys.exit('error: {}'.format(e))
+
+
+def shared_results(function, outputs, jobs):
+    """Return the results of the selected outputs of the PLA, minimized
+    together by MultiOutputMinimizer."""
+    minimizer = karnaughgen.MultiOutputMinimizer
+    names, tables = [], []
+    for name, _, values in function.maps(outputs):
+        names.append(name)
+        tables.append(values)
+    covers = minimizer.minimize(tables, jobs)
+    shared = minimizer.shared(covers)
+    codes = minimizer.generate(covers, tables)
+    return [{'id': name, 'caption': name.replace('_', r'\_'),
+             'latex': code,
+             'shared': [str(c) for c in minimizer.order(cover, shared)
+                        if c in shared]}
+            for name, cover, code in zip(names, covers, codes)]
+
+
+def write_results(args, results):
+    """Writes the results of batch or PLA jobs as --batch-output."""
+    import json
+    if args.batch_output == 'document':
+        try:
+            document = karnaughgen.DocumentAssembler(args.columns)
+            document.assemble(results, sys.stdout)
+        except karnaughgen.KarnaughError as e:
+            sys.exit('error: {}'.format(e))
+        return
+    for result in results:
+        if args.batch_output == 'raw':
+            if 'latex' in result:
+                sys.stdout.write(result['latex'])
+            report_raw(result)
+        else:
+            sys.stdout.write(json.dumps(result, sort_keys=True) + '\n')
+
+
+def report_raw(result):
+    """Ends the code of a map written in raw batch output, or reports the
+    error of the job."""
+    if 'error' in result:
+        sys.stderr.write('error: line {}: {}\n'.format(result['line'],
+                                                        result['error']))
+    else:
+        sys.stdout.write('\n')
+
+
+def report_verify(report):
+    """Writes the report of --verify, one line per problem."""
+    def minterms(ms):
+        return ', '.join(str(m) for m in ms)
+    if report.uncovered:
+        print('uncovered minterms:', minterms(report.uncovered))
+    for cube, zeros in sorted(report.zeros.items(), key=lambda i: str(i[0])):
+        print('cube {} covers zeros: {}'.format(cube, minterms(zeros)))
+    if report.redundant:
+        print('redundant cubes:', ' '.join(str(c) for c in report.redundant))
+    if report.nonprime:
+        print('non-prime cubes:', ' '.join(str(c) for c in report.nonprime))
+    if report.valid:
+        print('the cover is {}minimal'.format('' if report.minimal
+                                               else 'not '))
+
+
+def enable_stats(start):
+    """Records the phases of generating code, and the argument parsing
+    since start, and writes them to stderr at exit."""
+    import atexit
+    timings = karnaughgen.Timings()
+    timings.record('parse', timings.clock() - start)
+    karnaughgen.LaTeXGenerator.timings = timings
+    atexit.register(lambda: sys.stderr.write(timings.report()))
 
 
 def main():
-    values, cubes = parse_arguments()
+    start = karnaughgen.Timings.clock()
+    args = fast_parse(sys.argv[1:]) or parse_arguments()
+    if args.stats:
+        enable_stats(start)
+    if args.cache_dir is not None:
+        karnaughgen.LaTeXGenerator.cache = karnaughgen.DiskCache(
+            args.cache_dir)
+    if args.batch is not None:
+        batch(args)
+        return
+    if args.pla is not None:
+        pla(args)
+        return
     try:
-        latex = karnaughgen.LaTeXGenerator.generate(cubes, values)
-        print(latex)
+        cubes = args.cubes
+        if args.minimize:
+            cubes = karnaughgen.Minimizer.minimize(args.values)
+        if args.verify:
+            report = karnaughgen.CoverVerifier.verify(cubes, args.values)
+            report_verify(report)
+            if not report.valid:
+                sys.exit(1)
+        elif args.format == 'svg':
+            svg = karnaughgen.SVGGenerator.generate(cubes, args.values)
+            sys.stdout.write(svg)
+        else:
+            karnaughgen.LaTeXGenerator.generate_into(sys.stdout, cubes,
+                                                     args.values)
+            sys.stdout.write('\n')
     except karnaughgen.KarnaughError as e:
         print("error:", e)
 
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+
+# Copyright (c) 2013, Linus Karlsson
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#  * Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+#  * Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+#  * Neither the name of Linus Karlsson nor the names of the contributors may
+#    be used to endorse or promote products derived from this software without
+#    specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF
+# THE POSSIBILITY OF SUCH DAMAGE.
+
+# This is a drop-in replacement for karnaughgen-cli.py that renders through
+# karnaughgen-serve.py. It avoids importing argparse and karnaughgen, so that
+# rendering a map costs little more than a socket round trip. Anything but
+# the plain cubes and values form, as well as any error, is handed to
+# karnaughgen-cli.py.
+
+import json
+import os
+import socket
+import sys
+
+
+def default_socket():
+    """Returns the socket path used by karnaughgen-serve.py by default."""
+    return os.environ.get('KARNAUGHGEN_SOCKET',
+                          '/tmp/karnaughgen-{}.sock'.format(os.getuid()))
+
+
+def parse_job(argv):
+    """Returns the job for the command line, or None if it is not handled."""
+    job = {'cubes': []}
+    args = iter(argv)
+    for arg in args:
+        if arg in ('-v', '--values'):
+            job['values'] = next(args, None)
+        elif arg.startswith('--values='):
+            job['values'] = arg[len('--values='):]
+        elif arg.startswith('-v'):
+            job['values'] = arg[2:].lstrip('=')
+        elif arg in ('-m', '--minimize'):
+            job['minimize'] = True
+        elif arg.startswith('-'):
+            return None
+        else:
+            job['cubes'].append(arg)
+    if job.get('minimize'):
+        return job if job.get('values') and not job['cubes'] else None
+    if not job['cubes']:
+        return None
+    job.setdefault('values', '0' * 2 ** len(job['cubes'][0]))
+    return job
+
+
+def render(job):
+    """Returns the server result for the job, or None on failure."""
+    try:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(default_socket())
+            sock.sendall(json.dumps(job).encode('utf-8') + b'\n')
+            response = sock.makefile('rb').readline()
+        finally:
+            sock.close()
+        return json.loads(response.decode('utf-8'))
+    except (OSError, ValueError):
+        return None
+
+
+def run_cli():
+    import runpy
+    cli = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                       'karnaughgen-cli.py')
+    sys.argv[0] = cli
+    runpy.run_path(cli, run_name='__main__')
+
+
+def main():
+    job = parse_job(sys.argv[1:])
+    result = render(job) if job is not None else None
+    if result is None or 'latex' not in result:
+        run_cli()
+    else:
+        sys.stdout.write(result['latex'] + '\n')
+
+if __name__ == '__main__':
+    main()
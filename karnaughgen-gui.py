@@ -31,11 +31,9 @@
 
 from __future__ import division
 
-import itertools
-import math
 import sys
 
-from PySide import QtCore, QtGui
+from PySide import QtCore, QtGui, QtSvg
 
 import karnaughgen
 
@@ -44,7 +42,7 @@ class MainFrame(QtGui.QMainWindow):
 
     def __init__(self):
         super(MainFrame, self).__init__()
-        self.resize(500, 350)
+        self.resize(500, 750)
         self.move(50, 50)
         self.setWindowTitle('KarnaughLaTeX generator')
         self._hbox = QtGui.QHBoxLayout()
@@ -57,9 +55,15 @@ class MainFrame(QtGui.QMainWindow):
         # Implicant list
         self._implicant_list = ImplicantList(self._cubes)
         self._hbox.addWidget(self._implicant_list, QtCore.Qt.AlignRight)
+        # Undo and redo changes of the values in the Karnaugh map.
+        for keys, slot in [(QtGui.QKeySequence.Undo, self._karnaugh_map.undo),
+                           (QtGui.QKeySequence.Redo, self._karnaugh_map.redo)]:
+            QtGui.QShortcut(QtGui.QKeySequence(keys), self).activated.connect(
+                slot)
         # Variables combo box.
         variables_combo = QtGui.QComboBox(self)
-        variables_combo.addItems(['{} variables'.format(i) for i in [2, 3, 4]])
+        variables_combo.addItems(['{} variables'.format(i)
+                                  for i in range(2, 7)])
         variables_combo.setCurrentIndex(2)
         variables_combo.activated.connect(self._set_variables)
         self._vbox = QtGui.QVBoxLayout()
@@ -67,141 +71,205 @@ class MainFrame(QtGui.QMainWindow):
         # Add implicant-button
         self._add_button = QtGui.QPushButton('Add implicant')
         self._add_button.clicked.connect(self._add_implicant)
+        self._karnaugh_map.selection_valid.connect(
+            self._add_button.setEnabled)
         self._vbox.addLayout(self._hbox, 1)
         self._vbox.addWidget(self._add_button)
-        # Generate LaTeX-code-button
-        self._generate_latex_button = QtGui.QPushButton('Generate LaTeX')
-        self._generate_latex_button.clicked.connect(self._generate_latex)
-        self._vbox.addWidget(self._generate_latex_button)
+        # Output pane, updated whenever the values or the implicants change.
+        self._output = OutputPane(self._output_input)
+        self._vbox.addWidget(self._output, 1)
+        model = self._karnaugh_map.model()
+        model.dataChanged.connect(self._output.schedule)
+        model.modelReset.connect(self._output.schedule)
+        self._implicant_list.changed.connect(self._output.schedule)
+        self._output.schedule()
+        # Suggested implicants, updated as the values change.
+        model.dataChanged.connect(self._update_suggestions)
+        model.modelReset.connect(self._update_suggestions)
         # Cannot set layout on QMainWindow, so placeholder widget must be made.
         layout_widget = QtGui.QWidget()
         layout_widget.setLayout(self._vbox)
         self.setCentralWidget(layout_widget)
 
     def _add_implicant(self):
-        # Fetch current selection, validate it, convert to a cube ({0, 1, B})
-        try:
-            vertices = self._karnaugh_map.selected_vertices()
-            if len(vertices) > 0:
-                cube = self._validate_selection(vertices)
-                # Add cube to implicant list.
-                self._cubes.append(cube)
-                self._implicant_list.refresh_cubes()
-        except karnaughgen.KarnaughError as e:
-            QtGui.QMessageBox.warning(self, 'Warning', str(e))
+        # Fetch the cube of the current selection, which is None if the
+        # selection is not a valid implicant.
+        if not self._karnaugh_map.selectedIndexes():
+            return
+        cube = self._karnaugh_map.selected_cube()
+        if cube is None:
+            QtGui.QMessageBox.warning(self, 'Warning',
+                                      'Invalid implicant selection.')
+            return
+        # Add cube to implicant list.
+        self._cubes.append(cube)
+        self._implicant_list.refresh_cubes()
 
-    def _generate_latex(self):
-        """Takes all implicants and generates LaTeX code in a new dialog."""
-        try:
-            values = self._karnaugh_map.values()
-            self._dialog = LaTeXGeneratorDialog(self._cubes, values)
-            self._dialog.show()
-        except karnaughgen.KarnaughError as e:
-            QtGui.QMessageBox.warning(self, 'Warning', str(e))
+    def _update_suggestions(self, *args):
+        """Shows the suggested cover and essential primes of the values."""
+        primes = self._karnaugh_map.model().primes
+        self._implicant_list.set_suggestions(primes.suggestion(),
+                                             primes.essentials())
+
+    def _output_input(self):
+        """Returns the implicants and values shown by the output pane."""
+        return list(self._cubes), self._karnaugh_map.values()
 
     def _set_variables(self, index):
-        """Sets the variable count to 2, 3 or 4 variables."""
+        """Sets the variable count to 2 to 6 variables."""
         del self._cubes[:]  # Clear list while maintaing same object.
         self._implicant_list.refresh_cubes()
         self._karnaugh_map.set_variables(index + 2)
 
-    def _validate_selection(self, vertices):
-        def is_power_of_two(num):
-            return num != 0 and (num & (num - 1)) == 0
-        # Check total item count. Must be a power of 2.
-        if not is_power_of_two(len(vertices)):
-            raise karnaughgen.KarnaughError("Total count not power of 2, was",
-                                            len(vertices))
-        # Ensures that selection is a rectangle with element count that is 2^x.
-        return self._vertices_to_cube(vertices)
-
-    def _vertices_to_cube(self, vertices):
-        """Convert the list of vertices to a cube.
-
-        Throw an exception if the calculated cube has a size that does not
-        equal the coordinate count. This may happen if the input vertices
-        is not a rectangular area in the Karnaugh map.
-        """
-        def lattice(var):
-            if all(i == '1' for i in var):
-                return '1'
-            elif all(i == '0' for i in var):
-                return '0'
-            else:
-                return 'B'
-        cube = ''.join(lattice(var) for var in zip(*vertices))
-        # Now ensure that the generated cube has size equal to the vertex count
-        if 2 ** cube.count('B') != len(vertices):
-            raise karnaughgen.KarnaughError("Invalid implicant selection "
-                                            "for cube", cube)
-        return cube
 
+class KarnaughModel(QtCore.QAbstractTableModel):
+    """Table model of the cells of a Karnaugh map, backed by MapValues.
+
+    The prime implicants of the values are kept up to date by a
+    PrimeTracker, which is updated before dataChanged is emitted.
+    """
 
-class KarnaughMap(QtGui.QTableWidget):
+    def __init__(self, variables):
+        super(KarnaughModel, self).__init__()
+        self.cells = karnaughgen.MapValues(variables)
+        self.primes = karnaughgen.PrimeTracker(self.cells.values())
+
+    def set_variables(self, variables):
+        """Resets the model to all zero values of the variable count."""
+        self.beginResetModel()
+        self.cells = karnaughgen.MapValues(variables)
+        self.primes = karnaughgen.PrimeTracker(self.cells.values())
+        self.endResetModel()
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else self.cells.layout.rows
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else self.cells.layout.columns
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if role in (QtCore.Qt.DisplayRole, QtCore.Qt.EditRole):
+            return self.cells.get(index.row(), index.column())
+        if role == QtCore.Qt.TextAlignmentRole:
+            return QtCore.Qt.AlignCenter
+        return None
+
+    def setData(self, index, value, role=QtCore.Qt.EditRole):
+        """Sets the value of a cell. Values other than 0, 1 and - are
+        rejected."""
+        if role != QtCore.Qt.EditRole:
+            return False
+        try:
+            changed = self.cells.set(index.row(), index.column(), value)
+        except karnaughgen.KarnaughError:
+            return False
+        if changed:
+            self._changed([(index.row(), index.column())])
+        return True
+
+    def flags(self, index):
+        return (QtCore.Qt.ItemIsSelectable | QtCore.Qt.ItemIsEnabled |
+                QtCore.Qt.ItemIsEditable)
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if role != QtCore.Qt.DisplayRole:
+            return None
+        if orientation == QtCore.Qt.Horizontal:
+            return self.cells.layout.top_values[section]
+        return self.cells.layout.left_values[section]
+
+    def undo(self):
+        self._changed(self.cells.undo())
+
+    def redo(self):
+        self._changed(self.cells.redo())
+
+    def _changed(self, cells):
+        layout = self.cells.layout
+        for r, c in cells:
+            self.primes.set(layout.minterms[r * layout.columns + c],
+                            self.cells.get(r, c))
+            index = self.index(r, c)
+            self.dataChanged.emit(index, index)
+
+
+class KarnaughMap(QtGui.QTableView):
 
     ROW_HEIGHT = 50
+    # Highlight colors of selections that are and are not a valid implicant.
+    VALID_COLOR = '#3a9a3a'
+    INVALID_COLOR = '#c83c3c'
+
+    # Emitted with True when the selection changes to a valid implicant.
+    selection_valid = QtCore.Signal(bool)
 
     def __init__(self, variables):
-        """Create table view with correct row and column count."""
+        """Create table view of a model with the variable count."""
         super(KarnaughMap, self).__init__()
-        self.set_variables(variables)
-
-    def selected_vertices(self):
-        """Returns a set of vertices of the selected items."""
-        coords = ((i.row(), i.column()) for i in self.selectedIndexes())
-        return [self._left_values[r] + self._top_values[c] for r, c in coords]
+        self._model = KarnaughModel(variables)
+        self.setModel(self._model)
+        # All cells are squares.
+        for header in [self.horizontalHeader(), self.verticalHeader()]:
+            header.setDefaultSectionSize(self.ROW_HEIGHT)
+        self.selectionModel().selectionChanged.connect(
+            self._selection_changed)
+
+    def selected_cube(self):
+        """Returns the cube of the selected cells, or None if they are not a
+        valid implicant."""
+        cells = self._model.cells
+        mask = cells.layout.mask((i.row(), i.column())
+                                 for i in self.selectedIndexes())
+        return karnaughgen.Cube.from_mask(cells.layout.variables, mask)
+
+    def _selection_changed(self, *args):
+        """Shows whether the selection is a valid implicant, by the
+        highlight color and a tool tip, as the selection is made."""
+        cube = self.selected_cube()
+        valid = cube is not None
+        color = self.VALID_COLOR if valid else self.INVALID_COLOR
+        palette = self.palette()
+        palette.setColor(QtGui.QPalette.Highlight, QtGui.QColor(color))
+        self.setPalette(palette)
+        if valid:
+            self.setToolTip('Implicant {}'.format(cube))
+        elif self.selectedIndexes():
+            self.setToolTip('Not a valid implicant')
+        else:
+            self.setToolTip('')
+        self.selection_valid.emit(valid)
 
     def set_variables(self, variables):
         """Resets the Karnaugh map and sets the correct variable count."""
-        if variables > 4 or variables < 2:
-            raise karnaughgen.KarnaughError('Illegal variable count. '
-                                            'Must be between 2 and 4.')
-        left_vars = (variables // 2) * 2
-        top_vars = int(math.ceil(variables / 2)) * 2
-        self.setRowCount(left_vars)
-        self.setColumnCount(top_vars)
-        self._set_headers(left_vars, top_vars)
-        # Create cells, and set cell width equal to cell height for all cells.
-        indices = itertools.product(range(0, left_vars), range(0, top_vars))
-        for r, c in indices:
-            item = QtGui.QTableWidgetItem('0')
-            item.setTextAlignment(QtCore.Qt.AlignCenter)
-            self.setItem(r, c, item)
-        for row in range(0, left_vars):
-            self.setRowHeight(row, self.ROW_HEIGHT)
-        for col in range(0, top_vars):
-            self.setColumnWidth(col, self.rowHeight(0))
+        self._model.set_variables(variables)
 
     def values(self):
-        """Returns a list of all values entered in the Karnaugh map.
+        """Returns the values entered in the Karnaugh map as a TruthTable."""
+        return self._model.cells.values()
 
-        Uses natural ordering, such that e.g. 1111 is the last item of the list
-        """
-        coords = itertools.product(range(0, len(self._left_values)),
-                                   range(0, len(self._top_values)))
-        values = {}
-        for r, c in coords:
-            graycode = self._left_values[r] + self._top_values[c]
-            values[graycode] = self.item(r, c).text()
-        return [v for k, v in sorted(values.items())]
-
-    def _set_headers(self, left_vars, top_vars):
-        # left_vars and top_vars will only be 2 or 4.
-        two_var = ['0', '1']
-        four_var = ['00', '01', '11', '10']
-        self._left_values = two_var if left_vars == 2 else four_var
-        self._top_values = two_var if top_vars == 2 else four_var
-        self.setVerticalHeaderLabels(self._left_values)
-        self.setHorizontalHeaderLabels(self._top_values)
+    def undo(self):
+        self._model.undo()
+
+    def redo(self):
+        self._model.redo()
 
 
 class ImplicantList(QtGui.QListWidget):
+    """The list of implicants, followed by suggested implicants which are
+    added to the list by double-clicking them."""
+
+    VARIABLES = ['x1', 'x2', 'x3', 'x4', 'x5', 'x6']
+    SUGGESTION_COLOR = '#808080'
 
-    VARIABLES = ['x1', 'x2', 'x3', 'x4']
+    # Emitted when the list of cubes is shown after a change.
+    changed = QtCore.Signal()
 
     def __init__(self, cubes):
         super(ImplicantList, self).__init__()
         self._cubes = cubes
+        self._suggestions = []
+        self._essentials = set()
+        self.itemDoubleClicked.connect(self._add_suggestion)
         # React to both Delete and Backspace when deleting implicants.
         shortcuts = [QtGui.QShortcut(QtGui.QKeySequence(k), self)
                      for k in [QtCore.Qt.Key_Delete, QtCore.Qt.Key_Backspace]]
@@ -210,6 +278,17 @@ class ImplicantList(QtGui.QListWidget):
 
     def refresh_cubes(self):
         """Show all implicants of the cube list in this QListWidget."""
+        self._show()
+        self.changed.emit()
+
+    def set_suggestions(self, suggestions, essentials):
+        """Show the suggested cubes that are not in the list, marking the
+        essential ones."""
+        self._suggestions = list(suggestions)
+        self._essentials = set(essentials)
+        self._show()
+
+    def _show(self):
         def variable(pos, value):
             """Returns the variable as used in disjunctive form."""
             if value == '0':
@@ -220,34 +299,135 @@ class ImplicantList(QtGui.QListWidget):
                 return ''
 
         def expr(cube):
-            e = ''.join(variable(i, v) for i, v in enumerate(cube))
+            e = ''.join(variable(i, v) for i, v in enumerate(str(cube)))
             return e if len(e) > 0 else '1'
-        items = [expr(c) for c in self._cubes]
         self.clear()
-        self.addItems(items)
+        self.addItems([expr(c) for c in self._cubes])
+        for cube in self._pending_suggestions():
+            kind = 'essential' if cube in self._essentials else 'suggested'
+            item = QtGui.QListWidgetItem('{} ({})'.format(expr(cube), kind))
+            item.setForeground(QtGui.QColor(self.SUGGESTION_COLOR))
+            self.addItem(item)
+
+    def _pending_suggestions(self):
+        return [c for c in self._suggestions if c not in self._cubes]
+
+    def _add_suggestion(self, item):
+        row = self.row(item) - len(self._cubes)
+        if row >= 0:
+            self._cubes.append(self._pending_suggestions()[row])
+            self.refresh_cubes()
 
     def _delete_current(self):
-        if self.currentRow() < self.count() and self.currentRow() != -1:
+        if 0 <= self.currentRow() < len(self._cubes):
             del self._cubes[self.currentRow()]
             self.refresh_cubes()
 
 
-class LaTeXGeneratorDialog(QtGui.QWidget):
+class RenderSignals(QtCore.QObject):
+
+    # The generation of a RenderTask and its (latex, svg) or KarnaughError.
+    finished = QtCore.Signal(int, object)
+
+
+class RenderTask(QtCore.QRunnable):
+    """Generates the LaTeX code and SVG preview of a map on a worker thread.
+
+    The task is skipped if it is already stale when it starts, i.e. if its
+    generation is no longer the latest of the output pane.
+    """
+
+    def __init__(self, generation, latest, cubes, values, signals):
+        super(RenderTask, self).__init__()
+        self._generation = generation
+        self._latest = latest
+        self._cubes = cubes
+        self._values = values
+        self._signals = signals
+
+    def run(self):
+        if self._latest() != self._generation:
+            return
+        try:
+            result = (karnaughgen.LaTeXGenerator.generate(self._cubes,
+                                                          self._values),
+                      karnaughgen.SVGGenerator.generate(self._cubes,
+                                                        self._values))
+        except karnaughgen.KarnaughError as e:
+            result = e
+        self._signals.finished.emit(self._generation, result)
+
+
+class OutputPane(QtGui.QWidget):
+    """Shows the LaTeX code and a preview of the map, regenerated shortly
+    after every change.
+
+    The code is generated by RenderTasks on a worker thread from the cubes
+    and values returned by source. Only the result of the latest change is
+    shown, and tasks of older changes are skipped.
+    """
 
-    def __init__(self, cubes, values):
-        super(LaTeXGeneratorDialog, self).__init__()
-        self.resize(400, 200)
-        self.move(100, 100)
+    # Milliseconds to wait for further changes before regenerating.
+    DELAY = 150
+
+    def __init__(self, source):
+        super(OutputPane, self).__init__()
+        self._source = source
+        self._generation = 0
         font = QtGui.QFont("")
         font.setStyleHint(QtGui.QFont.TypeWriter)
-        self.setFont(font)
-        text = karnaughgen.LaTeXGenerator.generate(cubes, values)
-        text_edit = QtGui.QTextEdit()
-        text_edit.setPlainText(text)
+        self._text_edit = QtGui.QTextEdit()
+        self._text_edit.setFont(font)
+        self._text_edit.setReadOnly(True)
+        # Preview of the map, rendered as SVG.
+        self._preview = QtSvg.QSvgWidget()
         vbox = QtGui.QVBoxLayout()
         vbox.setContentsMargins(0, 0, 0, 0)
-        vbox.addWidget(text_edit)
+        vbox.addWidget(self._preview, 0, QtCore.Qt.AlignCenter)
+        vbox.addWidget(self._text_edit, 1)
         self.setLayout(vbox)
+        self._timer = QtCore.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(self.DELAY)
+        self._timer.timeout.connect(self._start)
+        # A single thread, so that tasks run in order and stale ones are
+        # skipped instead of competing with the latest one.
+        self._pool = QtCore.QThreadPool(self)
+        self._pool.setMaxThreadCount(1)
+        self._signals = RenderSignals()
+        self._signals.finished.connect(self._show)
+
+    def schedule(self, *args):
+        """Regenerates the output after DELAY, unless changed again.
+
+        Accepts and ignores the arguments of the signals it is connected to.
+        """
+        # A new generation makes any queued or running task stale.
+        self._generation += 1
+        self._timer.start()
+
+    def _start(self):
+        try:
+            cubes, values = self._source()
+        except karnaughgen.KarnaughError as e:
+            self._show(self._generation, e)
+            return
+        self._pool.start(RenderTask(self._generation, self._latest, cubes,
+                                    values, self._signals))
+
+    def _latest(self):
+        return self._generation
+
+    def _show(self, generation, result):
+        if generation != self._generation:
+            return
+        if isinstance(result, karnaughgen.KarnaughError):
+            self._text_edit.setPlainText('error: {}'.format(result))
+            return
+        latex, svg = result
+        self._text_edit.setPlainText(latex)
+        self._preview.load(QtCore.QByteArray(svg.encode('utf-8')))
+        self._preview.setFixedSize(self._preview.sizeHint())
 
 
 def main():
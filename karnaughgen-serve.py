@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+
+# Copyright (c) 2013, Linus Karlsson
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#  * Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+#  * Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+#  * Neither the name of Linus Karlsson nor the names of the contributors may
+#    be used to endorse or promote products derived from this software without
+#    specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF
+# THE POSSIBILITY OF SUCH DAMAGE.
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import socket
+import sys
+
+import karnaughgen
+
+
+def default_socket():
+    """Returns the socket path used when none is given."""
+    return os.environ.get('KARNAUGHGEN_SOCKET',
+                          '/tmp/karnaughgen-{}.sock'.format(os.getuid()))
+
+
+async def handle_client(reader, writer):
+    """Answers each job line of a client with a result line.
+
+    Jobs and results use the same JSON format as karnaughgen-cli.py --batch.
+    Clients may send several jobs before reading the results, which are
+    always returned in request order. Jobs are rendered by the default
+    executor, so a slow job does not block the other clients.
+    """
+    loop = asyncio.get_running_loop()
+    number = 0
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            number += 1
+            if not line.strip():
+                continue
+            try:
+                result = await loop.run_in_executor(
+                    None, karnaughgen.BatchRenderer.render, number,
+                    line.decode('utf-8', 'replace'))
+            except Exception as e:
+                # Answer every job, also the jobs sent after this one.
+                result = {'line': number,
+                          'error': '{}: {}'.format(type(e).__name__, e)}
+            writer.write((json.dumps(result, sort_keys=True) + '\n')
+                         .encode('utf-8'))
+            await writer.drain()
+    except (ValueError, ConnectionError):
+        # Too long lines, or the client went away.
+        pass
+    finally:
+        writer.close()
+
+
+def is_running(path):
+    """Returns True if a server already listens on the socket."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+        return True
+    except OSError:
+        return False
+    finally:
+        sock.close()
+
+
+async def serve(path):
+    if os.path.exists(path):
+        if is_running(path):
+            sys.exit('error: a server is already running on ' + path)
+        # A stale socket left by a server that did not shut down cleanly.
+        os.remove(path)
+    server = await asyncio.start_unix_server(handle_client, path=path)
+    stop = asyncio.get_running_loop().create_future()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        asyncio.get_running_loop().add_signal_handler(sig, stop.set_result,
+                                                      None)
+    try:
+        async with server:
+            await stop
+    finally:
+        os.remove(path)
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description='Serves LaTeX code for Karnaugh maps over a Unix socket. '
+        'Each line sent to the socket is a job as in karnaughgen-cli.py '
+        '--batch, and is answered by a JSON result line. '
+        'karnaughgen-client.py can be used in place of karnaughgen-cli.py '
+        'to render maps through the server.')
+    parser.add_argument('-s', '--socket', default=default_socket(),
+                        help='The path of the socket. Defaults to '
+                        '$KARNAUGHGEN_SOCKET or %(default)s.')
+    parser.add_argument('--cache-size', type=int, default=4096,
+                        help='The number of maps kept in memory. Use 0 to '
+                        'disable caching. Defaults to %(default)s.')
+    parser.add_argument('--cache-dir', metavar='DIR',
+                        help='Store generated code in DIR instead of in '
+                        'memory.')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    if args.cache_dir is not None:
+        karnaughgen.LaTeXGenerator.cache = karnaughgen.DiskCache(
+            args.cache_dir)
+    elif args.cache_size > 0:
+        karnaughgen.LaTeXGenerator.enable_cache(args.cache_size)
+    asyncio.run(serve(args.socket))
+
+if __name__ == '__main__':
+    main()
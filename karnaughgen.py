@@ -27,94 +27,1130 @@
 # ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF
 # THE POSSIBILITY OF SUCH DAMAGE.
 
+# Modules that are only needed by some features are imported where they are
+# used, to keep the import of this module, and thus CLI startup, fast.
+import errno
+import io
+import itertools
+import mmap
+import os
+import struct
+import time
+
+__version__ = '1.1'
+
+
+# The largest variable count supported by the generator.
+MAX_VARIABLES = 6
+
+# The largest variable count of functions given as truth table masks, e.g. by
+# Expression and PLA, which are drawn as submaps of MAX_VARIABLES or fewer.
+MAX_TABLE_VARIABLES = 20
+
+# os.replace is atomic also when the destination exists, but is Python 3 only.
+_replace = getattr(os, 'replace', os.rename)
+
+# The clock used by Timings. time.perf_counter is Python 3 only.
+_clock = getattr(time, 'perf_counter', time.time)
+
+
+def _check_variables(variables, low=2, high=MAX_VARIABLES):
+    """Raise KarnaughError unless low <= variables <= high."""
+    if not low <= variables <= high:
+        raise KarnaughError('Illegal variable count. '
+                            'Must be between {} and {}.'.format(low, high))
+
+
+# For each variable count, the masks of the minterms with bit i set, see
+# _bit_masks.
+_bit_mask_table = {}
+
+
+def _bit_masks(variables):
+    """Return, for each bit i, the mask of all minterms with bit i set, for
+    truth table masks of up to MAX_TABLE_VARIABLES variables."""
+    masks = _bit_mask_table.get(variables)
+    if masks is None:
+        _check_variables(variables, 1, MAX_TABLE_VARIABLES)
+        masks = []
+        size = 1 << variables
+        for i in range(variables):
+            width = 2 << i
+            mask = ((1 << (1 << i)) - 1) << (1 << i)
+            while width < size:
+                mask |= mask << width
+                width *= 2
+            masks.append(mask)
+        _bit_mask_table[variables] = masks
+    return masks
+
+
+def _minterms(mask):
+    """Return the list of minterms m for which bit m of mask is set."""
+    minterms = []
+    while mask:
+        bit = mask & -mask
+        minterms.append(bit.bit_length() - 1)
+        mask ^= bit
+    return minterms
+
 
 class KarnaughError(Exception):
     pass
 
 
+class Cube(object):
+    """A cube over 2-6 variables, stored as a pair of bit masks.
+
+    Variable x1 is the most significant bit. A set bit in care means that the
+    variable is fixed to the corresponding bit in value, a cleared bit means
+    that the variable is B (both 0 and 1). Cubes are immutable and hashable,
+    and len() returns the variable count, just as for the string form.
+    """
+
+    __slots__ = ('variables', 'value', 'care')
+
+    # For each variable count, a dict of every cube by its mask. Built by
+    # from_mask when first used.
+    _by_mask = {}
+
+    def __init__(self, variables, value, care):
+        full = (1 << variables) - 1
+        self.variables = variables
+        self.care = care & full
+        self.value = value & self.care
+
+    @classmethod
+    def parse(cls, s):
+        """Return the cube for a string of 2-6 chars from the set {0, 1, B}."""
+        if not 2 <= len(s) <= MAX_VARIABLES or s.strip('01B'):
+            raise KarnaughError('{} is not a valid cube'.format(s))
+        value = int(s.replace('B', '0'), 2)
+        care = int(s.replace('0', '1').replace('B', '0'), 2)
+        return cls(len(s), value, care)
+
+    @classmethod
+    def from_mask(cls, variables, mask):
+        """Return the cube covering exactly the minterms of a truth table
+        mask, see mask(), or None if they do not form a cube.
+
+        Uses an index of all cubes of the variable count, built once, so
+        that e.g. a selection in a Karnaugh map is checked by a lookup.
+        """
+        index = cls._by_mask.get(variables)
+        if index is None:
+            _check_variables(variables)
+            index = {}
+            for s in itertools.product('01B', repeat=variables):
+                cube = cls.parse(''.join(s))
+                index[cube.mask()] = cube
+            cls._by_mask[variables] = index
+        return index.get(mask)
+
+    def literals(self):
+        """Return the number of fixed variables of the cube."""
+        return bin(self.care).count('1')
+
+    def mirror(self, i, mask=None):
+        """Return the truth table mask of the mirror image of the cube
+        across variable bit i, which must be fixed, i.e. the cube with that
+        variable complemented. Mask is the mask of the cube, if known."""
+        if mask is None:
+            mask = self.mask()
+        shift = 1 << i
+        return mask >> shift if self.value >> i & 1 else mask << shift
+
+    def size(self):
+        """Return the number of minterms covered by the cube."""
+        return 1 << (self.variables - self.literals())
+
+    def covers(self, minterm):
+        """Return True if the minterm lies within the cube."""
+        return minterm & self.care == self.value
+
+    def contains(self, other):
+        """Return True if every minterm of the other cube is in this cube."""
+        return (other.care & self.care == self.care and
+                other.value & self.care == self.value)
+
+    def adjacent(self, other):
+        """Return True if the cubes differ in exactly one fixed variable."""
+        diff = self.value ^ other.value
+        return (self.care == other.care and diff != 0 and
+                diff & (diff - 1) == 0)
+
+    def merge(self, other):
+        """Return the cube spanning two adjacent cubes."""
+        if not self.adjacent(other):
+            raise KarnaughError('Cubes {} and {} are not adjacent'.format(
+                self, other))
+        care = self.care & ~(self.value ^ other.value)
+        return Cube(self.variables, self.value, care)
+
+    def minterms(self):
+        """Yield all minterms covered by the cube in increasing order."""
+        free = ~self.care & ((1 << self.variables) - 1)
+        sub = 0
+        while True:
+            yield self.value | sub
+            if sub == free:
+                return
+            sub = (sub - free) & free
+
+    def mask(self):
+        """Return the truth table of the cube as an int, where bit m is set
+        for every covered minterm m."""
+        mask = 1 << self.value
+        for i in range(self.variables):
+            if not self.care >> i & 1:
+                mask |= mask << (1 << i)
+        return mask
+
+    def __len__(self):
+        return self.variables
+
+    def __eq__(self, other):
+        if not isinstance(other, Cube):
+            return NotImplemented
+        return (self.variables == other.variables and
+                self.care == other.care and self.value == other.value)
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    def __hash__(self):
+        return hash((self.variables, self.value, self.care))
+
+    def __str__(self):
+        return ''.join('B' if not self.care >> i & 1 else
+                       '1' if self.value >> i & 1 else '0'
+                       for i in range(self.variables - 1, -1, -1))
+
+    def __repr__(self):
+        return 'Cube({!r})'.format(str(self))
+
+
+class TruthTable(object):
+    """The values of a function of 2-6 variables, stored as a pair of bit
+    masks.
+
+    Bit m of ones is set if the function is 1 for minterm m, and bit m of
+    dontcares if the function value is don't care. The string form is the
+    values in natural order, e.g. '-1-1', and the hex form gives each mask
+    as 2 ** variables / 4 hex digits (at least one), minterm 0 being the
+    least significant bit. Tables are immutable and hashable, and len()
+    returns the number of values, just as for the string form.
+    """
+
+    __slots__ = ('variables', 'ones', 'dontcares')
+
+    def __init__(self, variables, ones, dontcares=0):
+        _check_variables(variables)
+        full = (1 << (1 << variables)) - 1
+        if ones & ~full or dontcares & ~full or ones & dontcares:
+            raise KarnaughError('Invalid masks for {} variables.'.format(
+                variables))
+        self.variables = variables
+        self.ones = ones
+        self.dontcares = dontcares
+
+    @classmethod
+    def parse(cls, values):
+        """Return the table of values in string form, or a sequence of
+        '0', '1' and '-'."""
+        if isinstance(values, cls):
+            return values
+        values = ''.join(values)
+        variables = len(values).bit_length() - 1
+        if not 2 <= variables <= MAX_VARIABLES or \
+                2 ** variables != len(values):
+            raise KarnaughError("Invalid length of input values.")
+        invalid = next((v for v in values if v not in '01-'), None)
+        if invalid is not None:
+            raise KarnaughError("Invalid function value: {}".format(invalid))
+        # Minterm 0 is the first value but the least significant bit.
+        reverse = values[::-1]
+        ones = int(reverse.replace('-', '0'), 2)
+        dontcares = int(reverse.replace('1', '0').replace('-', '1'), 2)
+        return cls(variables, ones, dontcares)
+
+    @classmethod
+    def from_hex(cls, ones, dontcares=None):
+        """Return the table of masks in hex form, with an optional 0x
+        prefix. The number of digits gives the variable count."""
+        def parse(digits):
+            if digits[:2].lower() == '0x':
+                digits = digits[2:]
+            variables = {1: 2, 2: 3, 4: 4, 8: 5, 16: 6}.get(len(digits))
+            try:
+                if variables is not None:
+                    return variables, int(digits, 16)
+            except ValueError:
+                pass
+            raise KarnaughError('Invalid hex values: {}'.format(digits))
+        variables, ones = parse(ones)
+        if dontcares is None:
+            return cls(variables, ones)
+        dc_variables, dontcares = parse(dontcares)
+        if dc_variables != variables:
+            raise KarnaughError("Don't care mask does not match the values.")
+        return cls(variables, ones, dontcares)
+
+    def hex(self):
+        """Return (ones, dontcares) in hex form, without prefix."""
+        width = max((1 << self.variables) // 4, 1)
+        return ('{:0{}x}'.format(self.ones, width),
+                '{:0{}x}'.format(self.dontcares, width))
+
+    def zeros(self):
+        """Return the mask of minterms where the function is 0."""
+        full = (1 << (1 << self.variables)) - 1
+        return full & ~(self.ones | self.dontcares)
+
+    def __len__(self):
+        return 1 << self.variables
+
+    def __eq__(self, other):
+        if not isinstance(other, TruthTable):
+            return NotImplemented
+        return (self.variables == other.variables and
+                self.ones == other.ones and
+                self.dontcares == other.dontcares)
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    def __hash__(self):
+        return hash((self.variables, self.ones, self.dontcares))
+
+    def __str__(self):
+        return ''.join('-' if self.dontcares >> m & 1 else
+                       '1' if self.ones >> m & 1 else '0'
+                       for m in range(1 << self.variables))
+
+    def __repr__(self):
+        return 'TruthTable({!r})'.format(str(self))
+
+
+class Expression(object):
+    """A Boolean expression of the variables x1, x2, ..., compiled to mask
+    operations.
+
+    Terms are separated by + (or |), factors of a term are juxtaposed or
+    separated by * (or &), and a factor is a variable, 0, 1 or a
+    parenthesized expression, complemented by a trailing ' or a leading ~
+    (or !), e.g. "x1 x2' + x3 (x4 + x1')". The expression is parsed once
+    into a postfix program of mask operations, and evaluating it gives the
+    whole truth table in a single pass over the program, with the mask of
+    each variable from _bit_masks.
+    """
+
+    VARIABLE, CONSTANT, NOT, AND, OR = range(5)
+
+    def __init__(self, text, program, variables):
+        self.text = text
+        self.program = program
+        # The highest variable number used.
+        self.variables = variables
+
+    @classmethod
+    def parse(cls, text):
+        """Return the compiled expression of text."""
+        parser = _ExpressionParser(text)
+        program = parser.parse()
+        return cls(text, program, parser.variables)
+
+    def mask(self, variables):
+        """Return the mask of the minterms where the expression is 1, for a
+        function of the given number of variables, as for TruthTable."""
+        if self.variables > variables:
+            raise KarnaughError('Expression uses x{} but the function has {} '
+                                'variables.'.format(self.variables,
+                                                    variables))
+        # The mask of bit i is the mask of variable x(variables - i).
+        bits = _bit_masks(variables)
+        full = (1 << (1 << variables)) - 1
+        stack = []
+        for op, arg in self.program:
+            if op == Expression.VARIABLE:
+                stack.append(bits[variables - arg])
+            elif op == Expression.CONSTANT:
+                stack.append(full if arg else 0)
+            elif op == Expression.NOT:
+                stack[-1] ^= full
+            elif op == Expression.AND:
+                operand = stack.pop()
+                stack[-1] &= operand
+            else:
+                operand = stack.pop()
+                stack[-1] |= operand
+        return stack[0]
+
+    def table(self, variables=None):
+        """Return the TruthTable of the expression. The variable count
+        defaults to the highest variable used, and at least 2."""
+        if variables is None:
+            variables = max(self.variables, 2)
+        _check_variables(variables)
+        return TruthTable(variables, self.mask(variables))
+
+    def __str__(self):
+        return self.text
+
+
+class _ExpressionParser(object):
+    """Recursive descent parser of Expression, emitting its program."""
+
+    def __init__(self, text):
+        self.text = text
+        self.position = 0
+        self.program = []
+        self.variables = 0
+
+    def parse(self):
+        self._sum()
+        if self._peek() is not None:
+            self._error()
+        return self.program
+
+    def _peek(self):
+        while self.position < len(self.text) and \
+                self.text[self.position].isspace():
+            self.position += 1
+        if self.position < len(self.text):
+            return self.text[self.position]
+        return None
+
+    def _error(self):
+        if self.position >= len(self.text):
+            raise KarnaughError('Unexpected end of expression.')
+        raise KarnaughError('Invalid expression at position {}: {}'.format(
+            self.position + 1, self.text[self.position]))
+
+    def _sum(self):
+        self._product()
+        while self._peek() in ('+', '|'):
+            self.position += 1
+            self._product()
+            self.program.append((Expression.OR, None))
+
+    def _product(self):
+        self._factor()
+        while True:
+            c = self._peek()
+            if c in ('*', '&'):
+                self.position += 1
+            elif c is None or c not in 'xX01(~!':
+                return
+            self._factor()
+            self.program.append((Expression.AND, None))
+
+    def _factor(self):
+        c = self._peek()
+        if c in ('~', '!'):
+            self.position += 1
+            self._factor()
+            self.program.append((Expression.NOT, None))
+            return
+        if c in ('x', 'X'):
+            start = self.position = self.position + 1
+            while self.position < len(self.text) and \
+                    self.text[self.position].isdigit():
+                self.position += 1
+            if start == self.position:
+                self._error()
+            number = int(self.text[start:self.position])
+            if not 1 <= number <= MAX_TABLE_VARIABLES:
+                raise KarnaughError('Invalid variable: x{}'.format(number))
+            self.variables = max(self.variables, number)
+            self.program.append((Expression.VARIABLE, number))
+        elif c in ('0', '1'):
+            self.position += 1
+            self.program.append((Expression.CONSTANT, int(c)))
+        elif c == '(':
+            self.position += 1
+            self._sum()
+            if self._peek() != ')':
+                self._error()
+            self.position += 1
+        else:
+            self._error()
+        while self._peek() == "'":
+            self.position += 1
+            self.program.append((Expression.NOT, None))
+
+
+class MapLayout(object):
+    """The placement of minterms in a Karnaugh map of 2-6 variables.
+
+    As drawn by LaTeXGenerator, x1 (and x2 for 4 variables) label the rows and
+    the remaining variables label the columns, both in Gray code order. Maps
+    of 5 and 6 variables consist of 4-variable submaps, placed side by side
+    for x1 = 0 and 1 with 5 variables, and in two rows selected by x1 and two
+    columns selected by x2 with 6 variables. The labels of such maps start
+    with the selecting variable.
+    """
+
+    GRAY_CODES = {1: ['0', '1'], 2: ['00', '01', '11', '10']}
+
+    def __init__(self, variables):
+        _check_variables(variables)
+        self.variables = variables
+        # The number of leading label bits selecting the submap.
+        row_select = max(variables - 5, 0)
+        column_select = min(max(variables - 4, 0), 1)
+        self.left_values = self._labels(row_select, variables // 2)
+        self.top_values = self._labels(column_select,
+                                       variables - variables // 2)
+        self.rows = len(self.left_values)
+        self.columns = len(self.top_values)
+        # The minterm of every cell, in row-major order.
+        self.minterms = [int(l[:row_select] + t[:column_select] +
+                             l[row_select:] + t[column_select:], 2)
+                         for l in self.left_values for t in self.top_values]
+
+    def _labels(self, select, variables):
+        gray = self.GRAY_CODES[variables - select]
+        if not select:
+            return gray
+        return [s + g for s in '01' for g in gray]
+
+    def mask(self, cells):
+        """Return the truth table mask of the minterms of (row, column)
+        cells, e.g. to look up the cube of a selection with Cube.from_mask.
+        """
+        mask = 0
+        for row, column in cells:
+            mask |= 1 << self.minterms[row * self.columns + column]
+        return mask
+
+
+class MapValues(object):
+    """The editable values of a Karnaugh map, e.g. the cells of the GUI.
+
+    Values are stored as one byte ('0', '1' or '-') per minterm in natural
+    order, and cells are mapped to minterms by the MapLayout, which is
+    computed once. Every change records a snapshot of the previous values,
+    which are a few bytes, so that changes can be undone and redone.
+    """
+
+    VALUES = '01-'
+
+    def __init__(self, variables):
+        self.layout = MapLayout(variables)
+        self._values = bytearray(b'0' * (1 << variables))
+        self._undo = []
+        self._redo = []
+
+    def get(self, row, column):
+        """Return the value of a cell as a one-char string."""
+        minterm = self.layout.minterms[row * self.layout.columns + column]
+        return chr(self._values[minterm])
+
+    def set(self, row, column, value):
+        """Set the value of a cell, and return True if it changed."""
+        if len(value) != 1 or value not in self.VALUES:
+            raise KarnaughError('Invalid function value: {}'.format(value))
+        minterm = self.layout.minterms[row * self.layout.columns + column]
+        if self._values[minterm] == ord(value):
+            return False
+        self._undo.append(bytes(self._values))
+        del self._redo[:]
+        self._values[minterm] = ord(value)
+        return True
+
+    def buffer(self):
+        """Return a view of the values in natural order, without copying.
+        The view must not be modified."""
+        return memoryview(self._values)
+
+    def values(self):
+        """Return the values as a TruthTable."""
+        return TruthTable.parse(self._values.decode('ascii'))
+
+    def snapshot(self):
+        """Return the values as bytes, e.g. to restore them later."""
+        return bytes(self._values)
+
+    def restore(self, snapshot):
+        """Set all values from a snapshot, and return the (row, column) of
+        every cell that changed. The change can be undone."""
+        if len(snapshot) != len(self._values):
+            raise KarnaughError('Snapshot does not match the variable count.')
+        self._undo.append(bytes(self._values))
+        del self._redo[:]
+        return self._replace_values(snapshot)
+
+    def undo(self):
+        """Undo the last change, and return the cells that changed."""
+        if not self._undo:
+            return []
+        self._redo.append(bytes(self._values))
+        return self._replace_values(self._undo.pop())
+
+    def redo(self):
+        """Redo the last undone change, and return the cells that changed."""
+        if not self._redo:
+            return []
+        self._undo.append(bytes(self._values))
+        return self._replace_values(self._redo.pop())
+
+    def _replace_values(self, snapshot):
+        snapshot = bytearray(snapshot)
+        changed = [i for i, minterm in enumerate(self.layout.minterms)
+                   if self._values[minterm] != snapshot[minterm]]
+        self._values[:] = snapshot
+        return [divmod(i, self.layout.columns) for i in changed]
+
+
+class CacheStats(object):
+    """Counters of a RenderCache. Bytes is the size of all cached code."""
+
+    __slots__ = ('hits', 'misses', 'evictions', 'bytes')
+
+    def __init__(self):
+        self.hits = self.misses = self.evictions = self.bytes = 0
+
+    def __repr__(self):
+        return ('CacheStats(hits={}, misses={}, evictions={}, bytes={})'
+                .format(self.hits, self.misses, self.evictions, self.bytes))
+
+
+class RenderCache(object):
+    """A bounded cache of generated code, evicting the least recently used."""
+
+    def __init__(self, maxsize=1024):
+        if maxsize < 1:
+            raise KarnaughError('Cache size must be at least 1.')
+        self.maxsize = maxsize
+        self.stats = CacheStats()
+        import collections
+        import threading
+        self._items = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached code for key, or None if it is not cached."""
+        with self._lock:
+            code = self._items.pop(key, None)
+            if code is None:
+                self.stats.misses += 1
+                return None
+            # Reinsert to mark the item as most recently used.
+            self._items[key] = code
+            self.stats.hits += 1
+            return code
+
+    def put(self, key, code):
+        """Store code for key, evicting the least recently used item."""
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.stats.bytes -= len(old)
+            self._items[key] = code
+            self.stats.bytes += len(code)
+            while len(self._items) > self.maxsize:
+                _, evicted = self._items.popitem(last=False)
+                self.stats.bytes -= len(evicted)
+                self.stats.evictions += 1
+
+    def clear(self):
+        """Remove all cached items. The hit and miss counters are kept."""
+        with self._lock:
+            self._items.clear()
+            self.stats.bytes = 0
+
+    def __len__(self):
+        return len(self._items)
+
+
+class DiskCache(object):
+    """A content-addressed cache of generated code stored in a directory.
+
+    Uses the same keys as RenderCache. Each item is stored in a file named by
+    a hash of the key and the generator version, so that a new version never
+    reuses old output. Files are written atomically, and when the directory
+    is found to have grown past maxbytes the least recently used files are
+    removed. Errors reading or writing the directory count as misses, since
+    several processes may share it and the cache is only an optimization.
+    The bytes of stats are the size of the files on disk, as last scanned
+    by evict and updated by the puts since.
+    """
+
+    SUFFIX = '.tex'
+    # The expected number of scans of the directory for eviction per
+    # maxbytes of code stored. Each put scans with a probability in
+    # proportion to the size of its code, so that the cost of scanning is
+    # spread over many puts, also when the puts are made by many processes
+    # sharing the directory, as in a parallel build.
+    SCANS = 4
+
+    def __init__(self, path, maxbytes=16 * 1024 * 1024):
+        self.path = path
+        self.maxbytes = maxbytes
+        self.stats = CacheStats()
+
+    @staticmethod
+    def digest(key):
+        """Return the hash of a key, which is (variables, ones, dontcares,
+        cubes) or (variables, values, cubes) as in LaTeXGenerator.generate.
+        """
+        import hashlib
+        if len(key) == 4:
+            values = ['{:x}'.format(key[1]), '{:x}'.format(key[2])]
+        else:
+            values = [key[1]]
+        text = '\n'.join([__version__, str(key[0])] + values +
+                          [' '.join(str(c) for c in key[-1])])
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def _filename(self, key):
+        digest = self.digest(key)
+        return os.path.join(self.path, digest[:2], digest + self.SUFFIX)
+
+    def get(self, key):
+        """Return the cached code for key, or None if it is not cached."""
+        filename = self._filename(key)
+        try:
+            with io.open(filename, encoding='utf-8') as f:
+                code = f.read()
+        except (IOError, OSError):
+            self.stats.misses += 1
+            return None
+        try:
+            # The modification time marks the file as recently used.
+            os.utime(filename, None)
+        except OSError:
+            pass
+        self.stats.hits += 1
+        return code
+
+    def put(self, key, code):
+        """Atomically store code for key and evict files if needed."""
+        filename = self._filename(key)
+        try:
+            # The size of a file being replaced is no longer used.
+            old = os.path.getsize(filename)
+        except OSError:
+            old = 0
+        try:
+            self._write(filename, code)
+            size = os.path.getsize(filename)
+        except (IOError, OSError):
+            return
+        self.stats.bytes += size - old
+        import random
+        if random.random() * self.maxbytes < self.SCANS * size:
+            self.evict()
+
+    @staticmethod
+    def _write(filename, code):
+        directory = os.path.dirname(filename)
+        try:
+            os.makedirs(directory)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+        import tempfile
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with io.open(fd, 'w', encoding='utf-8') as f:
+                f.write(code)
+            _replace(tmp, filename)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+    def evict(self):
+        """Remove the least recently used files until under maxbytes."""
+        files = []
+        for root, _, names in os.walk(self.path):
+            for name in names:
+                if name.endswith(self.SUFFIX):
+                    filename = os.path.join(root, name)
+                    try:
+                        st = os.stat(filename)
+                    except OSError:
+                        # Removed by another process sharing the directory.
+                        continue
+                    files.append((st.st_mtime, st.st_size, filename))
+        total = sum(size for _, size, _ in files)
+        self.stats.bytes = total
+        for _, size, filename in sorted(files):
+            if total <= self.maxbytes:
+                break
+            try:
+                os.remove(filename)
+            except OSError:
+                continue
+            total -= size
+            self.stats.bytes = total
+            self.stats.evictions += 1
+
+    def clear(self):
+        """Remove all cached files."""
+        for root, _, names in os.walk(self.path):
+            for name in names:
+                if name.endswith(self.SUFFIX):
+                    try:
+                        os.remove(os.path.join(root, name))
+                    except OSError:
+                        pass
+        self.stats.bytes = 0
+
+
+class Timings(object):
+    """Counters of the time spent in each phase of generating code.
+
+    The generators record their phases while a Timings is set as
+    LaTeXGenerator.timings, and cost nothing but a check otherwise. The
+    phases are validate, cube (the code of one cube), header, footer, join
+    and generate, which is the whole call of generate or generate_into. If a
+    callback is given, it is called with the phase and the duration in
+    seconds of every record. Used as a context manager, the timings are set
+    for the duration of the block.
+    """
+
+    PERCENTILES = (50, 90, 99)
+
+    # The clock of all durations, e.g. for phases recorded by the caller.
+    clock = staticmethod(_clock)
+
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.started = _clock()
+        self._samples = {}
+        self._previous = None
+
+    def record(self, phase, seconds):
+        """Add a duration in seconds to a phase."""
+        samples = self._samples.get(phase)
+        if samples is None:
+            import array
+            samples = self._samples[phase] = array.array('d')
+        samples.append(seconds)
+        if self.callback is not None:
+            self.callback(phase, seconds)
+
+    def summary(self):
+        """Return a dict of the calls, total and percentiles (p50 etc.) in
+        seconds of every phase."""
+        summary = {}
+        for phase, samples in self._samples.items():
+            ordered = sorted(samples)
+            stats = {'calls': len(ordered), 'total': sum(ordered)}
+            for p in self.PERCENTILES:
+                index = max(0, -(-len(ordered) * p // 100) - 1)
+                stats['p{}'.format(p)] = ordered[index]
+            summary[phase] = stats
+        return summary
+
+    def report(self):
+        """Return the summary as a table, followed by the elapsed time and
+        the throughput of maps, i.e. generate calls, per second."""
+        summary = self.summary()
+        names = ['p{}'.format(p) for p in self.PERCENTILES]
+        lines = ['{:<10}{:>8}{:>12}'.format('phase', 'calls', 'total ms') +
+                 ''.join('{:>10}'.format(n + ' us') for n in names)]
+        for phase in sorted(summary):
+            stats = summary[phase]
+            lines.append('{:<10}{:>8}{:>12.3f}'.format(
+                phase, stats['calls'], stats['total'] * 1e3) +
+                ''.join('{:>10.1f}'.format(stats[n] * 1e6) for n in names))
+        elapsed = _clock() - self.started
+        maps = summary.get('generate', {}).get('calls', 0)
+        lines.append('{} maps in {:.3f} s, {:.1f} maps/s'.format(
+            maps, elapsed, maps / elapsed if elapsed > 0 else 0.0))
+        return '\n'.join(lines) + '\n'
+
+    def __enter__(self):
+        self._previous = LaTeXGenerator.timings
+        LaTeXGenerator.timings = self
+        return self
+
+    def __exit__(self, *exc_info):
+        LaTeXGenerator.timings = self._previous
+        self._previous = None
+
+
 class LaTeXGenerator(object):
 
+    # The cache used by generate, a RenderCache or a DiskCache, or None if
+    # caching is disabled.
+    cache = None
+
+    # The Timings recording the phases of generating code, or None.
+    timings = None
+
+    # Table of rendered \PrimImpl code by cube, filled by generate_cube as
+    # cubes are first used, so that importing the module stays cheap.
+    CUBES = {}
+
+    @staticmethod
+    def enable_cache(maxsize=1024):
+        """Cache the output of generate in a new cache, which is returned."""
+        LaTeXGenerator.cache = RenderCache(maxsize)
+        return LaTeXGenerator.cache
+
+    @staticmethod
+    def disable_cache():
+        """Stop caching the output of generate and drop the cache."""
+        LaTeXGenerator.cache = None
+
     @staticmethod
     def generate(cubes, values):
         """Return the generated LaTeX code for the given cubes."""
-        # Ensure that all cubes have identical amount of variables, and that
-        # the number of cubes is larger than 0. Also ensure that the length
-        # of values matches the amount of variable combinations.
-        if not len({len(c) for c in cubes}) == 1:
+        timings = LaTeXGenerator.timings
+        if timings is not None:
+            start = _clock()
+        cubes, variables, valstr = LaTeXGenerator._validate(cubes, values)
+        cache = LaTeXGenerator.cache
+        latex = None
+        if cache is not None:
+            # Values are keyed by the masks of their TruthTable, so that
+            # hashing and comparing keys are integer operations. Values of
+            # other characters than '0', '1' and '-' are drawn as given, and
+            # keyed by their string. The cube order is part of the key,
+            # since it decides the order of the implicants in the output.
+            table = values
+            if not isinstance(table, TruthTable) and valstr.strip('01-'):
+                key = (variables, valstr, tuple(cubes))
+            else:
+                table = TruthTable.parse(valstr)
+                key = (variables, table.ones, table.dontcares, tuple(cubes))
+            latex = cache.get(key)
+        if latex is None:
+            chunks = LaTeXGenerator._chunks(cubes, variables, valstr)
+            if timings is None:
+                latex = ''.join(chunks)
+            else:
+                chunks = list(chunks)
+                joined = _clock()
+                latex = ''.join(chunks)
+                timings.record('join', _clock() - joined)
+            if cache is not None:
+                cache.put(key, latex)
+        if timings is not None:
+            timings.record('generate', _clock() - start)
+        return latex
+
+    @staticmethod
+    def generate_chunks(cubes, values):
+        """Return an iterator over the generated LaTeX code in chunks.
+
+        The chunks are the header, the code of each cube and the footer, and
+        joined they equal the output of generate. The input is validated
+        before the iterator is returned.
+        """
+        cubes, variables, valstr = LaTeXGenerator._validate(cubes, values)
+        return LaTeXGenerator._chunks(cubes, variables, valstr)
+
+    @staticmethod
+    def generate_into(writer, cubes, values):
+        """Write the generated LaTeX code to writer, e.g. a file.
+
+        The code is written chunk by chunk, unless a cache is enabled, in
+        which case the complete code is written at once.
+        """
+        if LaTeXGenerator.cache is not None:
+            writer.write(LaTeXGenerator.generate(cubes, values))
+            return
+        timings = LaTeXGenerator.timings
+        if timings is not None:
+            start = _clock()
+        writer.writelines(LaTeXGenerator.generate_chunks(cubes, values))
+        if timings is not None:
+            timings.record('generate', _clock() - start)
+
+    @staticmethod
+    def _validate(cubes, values):
+        """Return (cubes, variables, values) with cubes parsed into Cubes and
+        values joined into a string. Values may also be a TruthTable."""
+        # Ensure that all cubes have identical amount of variables. An empty
+        # list of cubes is allowed, in which case the variable count is given
+        # by values. Also ensure that the length of values matches the amount
+        # of variable combinations.
+        timings = LaTeXGenerator.timings
+        if timings is not None:
+            start = _clock()
+        cubes = [c if isinstance(c, Cube) else Cube.parse(c) for c in cubes]
+        lengths = {len(c) for c in cubes}
+        if len(lengths) > 1:
             raise KarnaughError("Invalid input cubes.")
-        if not 2 ** len(cubes[0]) == len(values):
+        variables = lengths.pop() if lengths else len(values).bit_length() - 1
+        if not 2 <= variables <= MAX_VARIABLES or \
+                not 2 ** variables == len(values):
             raise KarnaughError("Invalid length of input values.")
-        implicants = '\n'.join(LaTeXGenerator.generate_cube(c) for c in cubes)
-        variables = len(cubes[0])
-        valstr = ''.join(values)
-        return '\n'.join([LaTeXGenerator.generate_header(variables, valstr),
-                          implicants,
-                          LaTeXGenerator.generate_footer()])
+        if isinstance(values, TruthTable):
+            valstr = str(values)
+        else:
+            valstr = ''.join(values)
+        if timings is not None:
+            timings.record('validate', _clock() - start)
+        return cubes, variables, valstr
+
+    @staticmethod
+    def _chunks(cubes, variables, valstr):
+        timings = LaTeXGenerator.timings
+        if timings is not None:
+            return LaTeXGenerator._timed_chunks(cubes, variables, valstr,
+                                                timings)
+        return LaTeXGenerator._plain_chunks(cubes, variables, valstr)
+
+    @staticmethod
+    def _plain_chunks(cubes, variables, valstr):
+        yield LaTeXGenerator.generate_header(variables, valstr)
+        for c in cubes:
+            yield '\n'
+            yield LaTeXGenerator._cube_code(c)
+        yield '\n'
+        yield LaTeXGenerator.generate_footer()
+
+    @staticmethod
+    def _timed_chunks(cubes, variables, valstr, timings):
+        """The chunks of _plain_chunks, recording the time of each."""
+        start = _clock()
+        header = LaTeXGenerator.generate_header(variables, valstr)
+        timings.record('header', _clock() - start)
+        yield header
+        for c in cubes:
+            yield '\n'
+            start = _clock()
+            code = LaTeXGenerator._cube_code(c)
+            timings.record('cube', _clock() - start)
+            yield code
+        yield '\n'
+        start = _clock()
+        footer = LaTeXGenerator.generate_footer()
+        timings.record('footer', _clock() - start)
+        yield footer
 
     @staticmethod
     def generate_cube(cube):
-        # Assume there are 4 variables, x1x2 on the left-hand side, x3x4 on top
-        # We wrap around the edge as soon as any variable pair is B0.
+        """Return the \\PrimImpl code for the given cube or cube string.
+
+        The code of a cube is computed by build_cube when the cube is first
+        used and then kept in the CUBES table, so after the first use this
+        is a plain table lookup.
+        """
+        timings = LaTeXGenerator.timings
+        if timings is not None:
+            start = _clock()
+        if not isinstance(cube, Cube):
+            cube = Cube.parse(cube)
+        code = LaTeXGenerator._cube_code(cube)
+        if timings is not None:
+            timings.record('cube', _clock() - start)
+        return code
+
+    @staticmethod
+    def _cube_code(cube):
+        code = LaTeXGenerator.CUBES.get(cube)
+        if code is None:
+            code = LaTeXGenerator.build_cube(str(cube))
+            LaTeXGenerator.CUBES[cube] = code
+        return code
+
+    @staticmethod
+    def build_cube(cube):
+        """Compute the \\PrimImpl code for the given cube from its geometry.
+
+        This is the reference implementation used to fill the CUBES table.
+        """
+        IMPL = '\\PrimImpl({:d},{:d})({:d},{:d})'
+        code = []
+        for x, y, width, height, mod in LaTeXGenerator.cube_geometry(cube):
+            v = IMPL.format(x, y, width, height)
+            code.append(v if mod == '' else '{}[{}]'.format(v, mod))
+        return '\n'.join(code)
+
+    @staticmethod
+    def cube_geometry(cube):
+        """Return the rectangles marking the given cube string.
+
+        Each rectangle is a tuple (x, y, width, height, mod) of the arguments
+        of \\PrimImpl, with the center (x, y) in picture coordinates and mod
+        the sides [rlbt] that are drawn for rectangles wrapping an edge.
+        """
+        # Up to 4 variables, x1 (and x2 for 4 variables) are on the left-hand
+        # side and the rest on top, both in Gray code order. A cube covers a
+        # contiguous span of cells along each axis, except when it wraps
+        # around the edge, which it does if its variables for an axis of
+        # four cells are B0. A wrapping cube is marked at both edges.
         # Example: 00B0 wrap left-right
         # Example: B011 wrap top-bottom.
         # Example: B0B0 wrap top-bottom and left-right.
-        # If there are 3 variables, assume x1 is the single left-hand variable
-        # This means that there cannot be any top-bottom wraps in this case.
-        # If there are 2 variables, no wraps can occur.
-        def coord(onetwovars):
-            """Maps the 1-2 left or 1-2 top variables to coordinate."""
-            m = {'00': 0,
-                 '01': 1,
-                 '11': 2,
-                 '10': 3,
-                 '0B': 0,
-                 '1B': 2,
-                 'B1': 1,
-                 'BB': 0}
-            return m['{:0>2}'.format(onetwovars)] * 10
-
-        def impl(x, y, width, height, mod=''):
-            """Returns a LaTeX prime implicant as \\PrimImpl(x,y)(w,h)[rlbt]"""
-            IMPL = '\\PrimImpl({:d},{:d})({:d},{:d})'
-            v = IMPL.format(x, y, width - 2, height - 2)
-            return v if mod == '' else '{}[{}]'.format(v, mod)
-
+        # For 5 and 6 variables, the cube is marked in every 4-variable
+        # submap it covers.
         variables = len(cube)
+        if variables > 4:
+            return LaTeXGenerator._submap_geometry(cube)
         leftvars = cube[:variables//2]
-        topvars = cube[-variables//2:]
+        topvars = cube[variables//2:]
+        # Centers and sizes along the x-axis, where the map starts at x = 10,
+        # and along the y-axis, where the top row is at y = rows * 10.
+        xs = [(10 + center, size, mod) for center, size, mod in
+              LaTeXGenerator._axis_spans(topvars, 'r', 'l')]
+        ys = [(2 ** len(leftvars) * 10 - center, size, mod) for center, size,
+              mod in LaTeXGenerator._axis_spans(leftvars, 'b', 't')]
+        # The rectangles are 2 units smaller than the cells they mark.
+        return [(x, y, width - 2, height - 2, xmod + ymod)
+                for y, height, ymod in ys for x, width, xmod in xs]
+
+    @staticmethod
+    def _axis_spans(pattern, first_mod, last_mod):
+        """Return the spans of a cube along an axis of a map.
 
-        def xcoord(width):
-            """Returns x-coordinate, origin is bottom-left."""
-            return 10 + coord(topvars) + width//2
+        The pattern is the cube's 1-2 variables of the axis. Each span is a
+        tuple of (center, size, mod) counted from the start of the axis. A
+        wrapping cube has one span beyond each edge, 10 units larger than the
+        cells it marks, with the mods telling the drawn side of each span.
+        """
+        cells = 2 ** len(pattern)
+        covered = [i for i in range(cells)
+                   if LaTeXGenerator._matches(pattern, i ^ i >> 1)]
+        size = len(covered) * 10
+        if covered[-1] - covered[0] < len(covered):
+            return [(covered[0] * 10 + size // 2, size, '')]
+        return [(-5, size + 10, first_mod),
+                (cells * 10 + 5, size + 10, last_mod)]
 
-        def ycoord(height):
-            """Returns y-coordinate, origin is bottom-left."""
-            return (2**len(leftvars))*10 - coord(leftvars) - height//2
+    @staticmethod
+    def submap_offsets(variables):
+        """Return the offsets (x, y) of the 4-variable submaps of a map.
 
-        code = []
-        # These height and width will require 10 extra px if they are wrapped.
-        width = (2 ** topvars.count('B')) * 10
-        height = (2 ** leftvars.count('B')) * 10
-        # Constant coordinates used in wraps.
-        x_left, x_right, y_bottom, y_top = 5, 55, -5, 45
-        if variables == 4 and cube == 'B0B0':
-            # Special case, mark the four corners.
-            code.append(impl(x_left, y_top, width + 10, height + 10, 'rb'))
-            code.append(impl(x_right, y_top, width + 10, height + 10, 'lb'))
-            code.append(impl(x_left, y_bottom, width + 10, height + 10, 'rt'))
-            code.append(impl(x_right, y_bottom, width + 10, height + 10, 'lt'))
-        elif variables == 4 and leftvars == 'B0':
-            # Wrap top-bottom.
-            code.append(impl(xcoord(width), y_top, width, height + 10, 'b'))
-            code.append(impl(xcoord(width), y_bottom, width, height + 10, 't'))
-        elif variables >= 3 and topvars == 'B0':
-            # Wrap left-right.
-            code.append(impl(x_left, ycoord(height), width + 10, height, 'r'))
-            code.append(impl(x_right, ycoord(height), width + 10, height, 'l'))
-        else:
-            # Ordinary cases here, no wraps.
-            code.append(impl(xcoord(width), ycoord(height), width, height))
-        return '\n'.join(code)
+        A map of 5 variables consists of two submaps side by side, selected
+        by x1. A map of 6 variables consists of four submaps, where x1
+        selects the row (top for 0) and x2 the column.
+        """
+        if variables == 5:
+            return [(0, 0), (60, 0)]
+        return [(0, 60), (60, 60), (0, 0), (60, 0)]
+
+    @staticmethod
+    def _submap_geometry(cube):
+        variables = len(cube)
+        select, sub = cube[:variables - 4], cube[variables - 4:]
+        rects = []
+        for index, (ox, oy) in enumerate(
+                LaTeXGenerator.submap_offsets(variables)):
+            if LaTeXGenerator._matches(select, index):
+                rects.extend((x + ox, y + oy, width, height, mod)
+                             for x, y, width, height, mod in
+                             LaTeXGenerator.cube_geometry(sub))
+        return rects
+
+    @staticmethod
+    def _matches(pattern, value):
+        """Return True if the bits of value match a string of 0, 1 and B."""
+        n = len(pattern)
+        return all(p == 'B' or int(p) == value >> (n - 1 - i) & 1
+                   for i, p in enumerate(pattern))
 
     @staticmethod
     def generate_footer():
@@ -125,8 +1161,1401 @@ class LaTeXGenerator(object):
         HEADER = ('\\begin{{picture}}(60,60)(0,0)\n'
                   '\\put(0,10){{\n'
                   '\\Karnaughdiagram{{{:d}}}{{{}}}(${}$, ${}$)[${}$]')
-        VARS = ['x_1', 'x_2', 'x_3', 'x_4']
+        VARS = ['x_1', 'x_2', 'x_3', 'x_4', 'x_5', 'x_6']
+        func = 'f'
+        if variables > 4:
+            return LaTeXGenerator._submap_header(variables, values, VARS,
+                                                 func)
         left_vars = ' '.join(VARS[:variables//2])
         top_vars = ' '.join(VARS[variables//2:variables])
-        func = 'f'
         return HEADER.format(variables, values, left_vars, top_vars, func)
+
+    @staticmethod
+    def _submap_header(variables, values, VARS, func):
+        """Return the header of a map of 5 or 6 variables, which draws a
+        4-variable diagram for each submap, labeled with its selection."""
+        offsets = LaTeXGenerator.submap_offsets(variables)
+        select = variables - 4
+        header = ['\\begin{{picture}}(120,{:d})(0,0)'.format(
+                      60 * (len(offsets) // 2)),
+                  '\\put(0,10){']
+        left_vars = ' '.join(VARS[select:select + 2])
+        top_vars = ' '.join(VARS[select + 2:variables])
+        select_vars = ' '.join(VARS[:select])
+        for index, (ox, oy) in enumerate(offsets):
+            header.append('\\put({:d},{:d}){{\\Karnaughdiagram{{4}}{{{}}}'
+                          '(${}$, ${}$)[${}$]}}'.format(
+                              ox, oy, values[index * 16:(index + 1) * 16],
+                              left_vars, top_vars, func))
+            header.append('\\put({:d},{:d}){{\\makebox(0,0)'
+                          '{{${} = {:0{}b}$}}}}'.format(
+                              ox + 30, oy - 6, select_vars, index, select))
+        return '\n'.join(header)
+
+
+class SVGGenerator(object):
+    """Renders Karnaugh maps as standalone SVG, e.g. for previews.
+
+    The map has the same layout as the LaTeX output, and implicants use the
+    rectangles of LaTeXGenerator.cube_geometry. Rectangles wrapping an edge
+    are clipped by the map, which leaves them open on the wrapped side.
+    """
+
+    # Pixels per picture unit, where a cell is 10 units.
+    SCALE = 4
+    # Space for the labels to the left of and above the map, in units.
+    MARGIN = 16
+    COLORS = ['#d62728', '#1f77b4', '#2ca02c', '#ff7f0e', '#9467bd',
+              '#8c564b', '#e377c2', '#17becf']
+    VARIABLES = ['x1', 'x2', 'x3', 'x4', 'x5', 'x6']
+    _geometry = {}
+
+    @staticmethod
+    def generate(cubes, values, colors=None):
+        """Return the SVG document for the given cubes.
+
+        Colors is the index in COLORS of each cube, e.g. as given by
+        MultiOutputMinimizer.colors. By default cube i has color i.
+        """
+        cubes, variables, valstr = LaTeXGenerator._validate(cubes, values)
+        if colors is None:
+            colors = range(len(cubes))
+        elif len(colors) != len(cubes):
+            raise KarnaughError('Expected a color for each cube.')
+        # Maps of 5 and 6 variables are drawn as 4-variable submaps, placed
+        # as by LaTeXGenerator.submap_offsets.
+        select = max(variables - 4, 0)
+        layout = MapLayout(variables - select)
+        if select:
+            offsets = LaTeXGenerator.submap_offsets(variables)
+        else:
+            offsets = [(0, 0)]
+        m = SVGGenerator.MARGIN
+        grid_w, grid_h = layout.columns * 10, layout.rows * 10
+        # The size of the picture area covered by the grids.
+        pic_w = max(ox for ox, _ in offsets) + grid_w
+        pic_h = max(oy for _, oy in offsets) + grid_h
+        width, height = m + pic_w + 4, m + pic_h + 4 + (8 if select else 0)
+        scale = SVGGenerator.SCALE
+        svg = ['<svg xmlns="http://www.w3.org/2000/svg" width="{}" '
+               'height="{}" viewBox="0 0 {} {}" font-family="sans-serif" '
+               'font-size="5" text-anchor="middle" '
+               'dominant-baseline="central">'.format(
+                   width * scale, height * scale, width, height),
+               '<clipPath id="map">']
+        grids = [(m + ox, m + pic_h - oy - grid_h) for ox, oy in offsets]
+        for x, y in grids:
+            svg.append('<rect x="{}" y="{}" width="{}" height="{}"/>'.format(
+                x, y, grid_w, grid_h))
+        svg.append('</clipPath>')
+        names = SVGGenerator.VARIABLES
+        left = select + (variables - select) // 2
+        for index, (x, y) in enumerate(grids):
+            size = 2 ** (variables - select)
+            SVGGenerator._grid(svg, layout, x, y,
+                               valstr[index * size:(index + 1) * size],
+                               ''.join(names[select:left]),
+                               ''.join(names[left:variables]))
+            if select:
+                svg.append('<text x="{}" y="{}" font-size="4">{} = {:0{}b}'
+                           '</text>'.format(x + grid_w / 2.0, y + grid_h + 5,
+                                            ''.join(names[:select]), index,
+                                            select))
+        # Implicants, in picture coordinates where the map is at x 10 to
+        # 10 + pic_w and y 0 to pic_h, with the origin at the bottom left.
+        svg.append('<g clip-path="url(#map)" fill="none" stroke-width="0.6">')
+        for i, cube in zip(colors, cubes):
+            color = SVGGenerator.COLORS[i % len(SVGGenerator.COLORS)]
+            for x, y, w, h, _ in SVGGenerator.geometry(cube):
+                svg.append('<rect x="{}" y="{}" width="{}" height="{}" '
+                           'rx="3" stroke="{}"/>'.format(
+                               m + x - 10 - w / 2.0, m + pic_h - y - h / 2.0,
+                               w, h, color))
+        svg.append('</g>')
+        svg.append('</svg>\n')
+        return '\n'.join(svg)
+
+    @staticmethod
+    def _grid(svg, layout, x, y, values, left_vars, top_vars):
+        """Append the grid lines, labels and values of a map at (x, y)."""
+        esc = SVGGenerator._escape
+        grid_w, grid_h = layout.columns * 10, layout.rows * 10
+        svg.append('<rect x="{}" y="{}" width="{}" height="{}" fill="none" '
+                   'stroke="black" stroke-width="0.5"/>'.format(
+                       x, y, grid_w, grid_h))
+        for r in range(1, layout.rows):
+            svg.append('<line x1="{}" y1="{}" x2="{}" y2="{}" stroke="black" '
+                       'stroke-width="0.25"/>'.format(x, y + r * 10,
+                                                       x + grid_w, y + r * 10))
+        for c in range(1, layout.columns):
+            svg.append('<line x1="{}" y1="{}" x2="{}" y2="{}" stroke="black" '
+                       'stroke-width="0.25"/>'.format(x + c * 10, y,
+                                                       x + c * 10, y + grid_h))
+        svg.append('<text x="{}" y="{}" font-size="4" text-anchor="end">{}'
+                   '</text>'.format(x - 1, y - 7, left_vars))
+        svg.append('<text x="{}" y="{}" font-size="4" text-anchor="start">{}'
+                   '</text>'.format(x + 1, y - 7, top_vars))
+        for r, label in enumerate(layout.left_values):
+            svg.append('<text x="{}" y="{}" font-size="4">{}</text>'.format(
+                x - 5, y + r * 10 + 5, label))
+        for c, label in enumerate(layout.top_values):
+            svg.append('<text x="{}" y="{}" font-size="4">{}</text>'.format(
+                x + c * 10 + 5, y - 3, label))
+        for i, minterm in enumerate(layout.minterms):
+            r, c = divmod(i, layout.columns)
+            svg.append('<text x="{}" y="{}">{}</text>'.format(
+                x + c * 10 + 5, y + r * 10 + 5, esc(values[minterm])))
+
+    @staticmethod
+    def geometry(cube):
+        """Return the rectangles of a cube, see LaTeXGenerator.cube_geometry.
+        """
+        rects = SVGGenerator._geometry.get(cube)
+        if rects is None:
+            rects = LaTeXGenerator.cube_geometry(str(cube))
+            SVGGenerator._geometry[cube] = rects
+        return rects
+
+    @staticmethod
+    def _escape(text):
+        return (text.replace('&', '&amp;').replace('<', '&lt;')
+                .replace('>', '&gt;'))
+
+
+class Minimizer(object):
+    """Two-level minimization using the Quine-McCluskey method.
+
+    Function values are given as for LaTeXGenerator.generate, i.e. a sequence
+    of '0', '1' and '-' (don't care) in natural order, or as a TruthTable.
+    """
+
+    @staticmethod
+    def minimize(values):
+        """Return a minimal list of cubes covering the ones of values."""
+        table = TruthTable.parse(values)
+        # Fully specified 4-variable functions are looked up in the cover
+        # table, whose index is the mask of ones.
+        if table.variables == CoverTable.VARIABLES and not table.dontcares:
+            covers = CoverTable.default()
+            if covers is not None:
+                return covers.lookup(table.ones)
+        variables, ones, dontcares = Minimizer.parse_values(table)
+        primes = Minimizer.prime_implicants(variables, ones, dontcares)
+        return Minimizer.minimal_cover(primes, ones)
+
+    @staticmethod
+    def parse_values(values):
+        """Return (variables, ones, dontcares), where the last two are lists
+        of minterms. Values may also be a TruthTable."""
+        table = TruthTable.parse(values)
+        return (table.variables, _minterms(table.ones),
+                _minterms(table.dontcares))
+
+    @staticmethod
+    def prime_implicants(variables, ones, dontcares=()):
+        """Return all prime implicants of the function as a list of cubes.
+
+        Cubes are merged level by level. Each level maps a care mask to the set
+        of values having that care mask, so finding the partner of a cube that
+        differs in one variable is a single set lookup.
+        """
+        full = (1 << variables) - 1
+        level = {full: set(ones) | set(dontcares)}
+        primes = []
+        while level:
+            merged = {}
+            for care, group in level.items():
+                used = set()
+                for value in group:
+                    bits = care & ~value
+                    while bits:
+                        bit = bits & -bits
+                        bits ^= bit
+                        if value | bit in group:
+                            used.add(value)
+                            used.add(value | bit)
+                            merged.setdefault(care & ~bit, set()).add(value)
+                primes.extend(Cube(variables, v, care)
+                              for v in group if v not in used)
+            level = merged
+        return primes
+
+    @staticmethod
+    def minimal_cover(primes, ones, weights=None):
+        """Return a minimal list of primes covering all the given minterms.
+
+        Covers are ordered first by the number of cubes, then by the sum of
+        the weights of their primes, highest first, if weights are given,
+        then by the number of literals, and last by the indices of their
+        primes, so that ties are always broken the same way. Essential
+        primes and dominated rows and columns are removed until only the
+        cyclic core remains, which is solved by a branch and bound search
+        that branches on the minterm with the fewest covering primes and
+        prunes with a lower bound on the number of cubes still needed.
+        """
+        masks = [cube.mask() for cube in primes]
+        # Rank primes by their share of the cost; the index breaks ties so
+        # that of two equal primes exactly one dominates the other.
+        rank = [(-(weights[i] if weights else 0), cube.literals(), i)
+                for i, cube in enumerate(primes)]
+        uncovered = 0
+        for m in ones:
+            uncovered |= 1 << m
+
+        def cost(indices):
+            return (len(indices), sum(rank[i][0] for i in indices),
+                    sum(rank[i][1] for i in indices), sorted(indices))
+
+        def columns(uncovered, candidates):
+            """Return the bitset of candidates covering each minterm."""
+            result = {}
+            remaining = uncovered
+            while remaining:
+                bit = remaining & -remaining
+                remaining ^= bit
+                result[bit] = sum(1 << i for i in candidates
+                                  if masks[i] & bit)
+            return result
+
+        def reduce(uncovered, candidates):
+            """Return the essential primes, and the cyclic core left."""
+            chosen = []
+            while uncovered:
+                # Drop primes covered by a prime of no greater cost.
+                order = sorted(candidates, key=lambda i: (
+                    -bin(masks[i] & uncovered).count('1'), rank[i]))
+                kept = []
+                for i in order:
+                    mask = masks[i] & uncovered
+                    if mask and not any(mask & ~masks[j] == 0 and
+                                        rank[j] < rank[i] for j in kept):
+                        kept.append(i)
+                rows = columns(uncovered, kept)
+                essential = [bits for bits in rows.values()
+                             if bits & (bits - 1) == 0]
+                if essential:
+                    for bits in set(essential):
+                        i = bits.bit_length() - 1
+                        chosen.append(i)
+                        uncovered &= ~masks[i]
+                    candidates = [i for i in kept if i not in chosen]
+                    continue
+                # Drop minterms covered by every cover of another minterm.
+                bits = sorted(rows, key=lambda b: bin(rows[b]).count('1'))
+                for n, a in enumerate(bits):
+                    if uncovered & a:
+                        for b in bits[n + 1:]:
+                            if rows[a] & ~rows[b] == 0:
+                                uncovered &= ~b
+                if len(kept) == len(candidates) and len(rows) == \
+                        bin(uncovered).count('1'):
+                    return chosen, uncovered, kept
+                candidates = kept
+            return chosen, 0, []
+
+        best = [None, None]
+
+        def search(uncovered, candidates, picked):
+            chosen, uncovered, candidates = reduce(uncovered, candidates)
+            picked = picked + chosen
+            if not uncovered:
+                c = cost(picked)
+                if best[0] is None or c < best[1]:
+                    best[0], best[1] = picked, c
+                return
+            rows = columns(uncovered, candidates)
+            bits = sorted(rows, key=lambda b: bin(rows[b]).count('1'))
+            # Minterms sharing no prime each need a cube of their own.
+            bound, used = 0, 0
+            for bit in bits:
+                if not rows[bit] & used:
+                    bound += 1
+                    used |= rows[bit]
+            if best[0] is not None and len(picked) + bound > best[1][0]:
+                return
+            branch = rows[bits[0]]
+            for i in sorted(candidates, key=lambda i: rank[i]):
+                if branch >> i & 1:
+                    search(uncovered & ~masks[i],
+                           [j for j in candidates if j != i], picked + [i])
+
+        search(uncovered, list(range(len(primes))), [])
+        cover = [primes[i] for i in best[0]]
+        cover.sort(key=lambda c: (-c.size(), c.value, c.care))
+        return cover
+
+
+class MultiOutputMinimizer(object):
+    """Minimization of several functions of the same variables, sharing
+    implicants between them.
+
+    The prime implicants of all outputs are found at once by Quine-McCluskey,
+    where each cube is tagged with the bitset of the outputs it is an
+    implicant of, and merging two cubes intersects their tags. A cube is
+    kept as a prime unless a merge keeps its whole tag, so the primes
+    include the smaller cubes shared by several outputs. The cover of each
+    output is then selected from the primes tagged with it, by worker
+    processes if there is more than one job. Each cover is minimal for its
+    output, and of the minimal covers, the one sharing the most cubes with
+    the other outputs is chosen, in two rounds: first by the number of
+    outputs each prime could be shared with, then by the number of first
+    round covers using it.
+    """
+
+    @staticmethod
+    def minimize(tables, jobs=1):
+        """Return a list of the covers of the tables, which are TruthTables
+        or values as for Minimizer.minimize."""
+        tables = [TruthTable.parse(t) for t in tables]
+        if not tables or len({t.variables for t in tables}) != 1:
+            raise KarnaughError('Outputs must have the same variable count.')
+        variables = tables[0].variables
+        primes = MultiOutputMinimizer.prime_implicants(tables)
+        candidates = []
+        for j, table in enumerate(tables):
+            candidates.append([(cube, cube.mask(), tag)
+                               for cube, tag in primes if tag >> j & 1
+                               and cube.mask() & table.ones])
+
+        def shareable(cube, mask, tag):
+            return sum(1 for k, t in enumerate(tables)
+                       if tag >> k & 1 and mask & t.ones) - 1
+        first = [[(c.value, c.care, shareable(c, m, tag))
+                  for c, m, tag in primes_j] for primes_j in candidates]
+        pool = None
+        if jobs > 1:
+            import multiprocessing
+            pool = multiprocessing.Pool(min(jobs, len(tables)))
+        try:
+            select = pool.map if pool is not None else map
+            covers = list(select(_select_cover, [
+                (variables, first[j], t.ones) for j, t in enumerate(tables)]))
+            uses = {}
+            for cover in covers:
+                for cube in cover:
+                    uses[cube] = uses.get(cube, 0) + 1
+            second = []
+            for j, t in enumerate(tables):
+                own = set(covers[j])
+                second.append((variables, [
+                    (v, c, uses.get((v, c), 0) - ((v, c) in own))
+                    for v, c, _ in first[j]], t.ones))
+            covers = list(select(_select_cover, second))
+            if pool is not None:
+                pool.close()
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+        return [[Cube(variables, v, c) for v, c in cover]
+                for cover in covers]
+
+    @staticmethod
+    def prime_implicants(tables):
+        """Return the multiple-output primes of the tables as a list of
+        (cube, tag), where bit j of tag is set if the cube is an implicant of
+        output j.
+
+        As in Minimizer.prime_implicants, each level maps a care mask to its
+        cubes, here a dict of value to tag.
+        """
+        variables = tables[0].variables
+        full = (1 << variables) - 1
+        group = {}
+        for j, table in enumerate(tables):
+            for m in _minterms(table.ones | table.dontcares):
+                group[m] = group.get(m, 0) | 1 << j
+        level = {full: group}
+        primes = []
+        while level:
+            merged = {}
+            for care, group in level.items():
+                dominated = set()
+                for value, tag in group.items():
+                    bits = care & ~value
+                    while bits:
+                        bit = bits & -bits
+                        bits ^= bit
+                        other = group.get(value | bit)
+                        shared = tag & other if other else 0
+                        if not shared:
+                            continue
+                        merged.setdefault(care & ~bit, {})[value] = shared
+                        if shared == tag:
+                            dominated.add(value)
+                        if shared == other:
+                            dominated.add(value | bit)
+                primes.extend((Cube(variables, v, care), tag)
+                              for v, tag in group.items()
+                              if v not in dominated)
+            level = merged
+        return primes
+
+    @staticmethod
+    def shared(covers):
+        """Return the cubes used by more than one of the covers, in the
+        order of Minimizer.minimal_cover."""
+        uses = {}
+        for cover in covers:
+            for cube in set(cover):
+                uses[cube] = uses.get(cube, 0) + 1
+        shared = [cube for cube, n in uses.items() if n > 1]
+        shared.sort(key=lambda c: (-c.size(), c.value, c.care))
+        return shared
+
+    @staticmethod
+    def generate(covers, tables):
+        """Return the LaTeX code of the map of each output.
+
+        The shared cubes of the covers come first in every map, in the same
+        order, and are drawn with thick lines. For SVG maps, pass
+        SVGGenerator.generate the cubes returned by order and their colors
+        returned by colors, so that each shared cube has the same color in
+        all maps.
+        """
+        shared = MultiOutputMinimizer.shared(covers)
+        codes = []
+        for cover, table in zip(covers, tables):
+            cubes, variables, valstr = LaTeXGenerator._validate(
+                MultiOutputMinimizer.order(cover, shared), table)
+            lines = [LaTeXGenerator.generate_header(variables, valstr)]
+            for cube in cubes:
+                code = LaTeXGenerator.generate_cube(cube)
+                if cube in shared:
+                    code = '{{\\thicklines{}}}'.format(code)
+                lines.append(code)
+            lines.append(LaTeXGenerator.generate_footer())
+            codes.append('\n'.join(lines))
+        return codes
+
+    @staticmethod
+    def order(cover, shared):
+        """Return the cubes of cover, the shared ones first in their order.
+        """
+        own = [c for c in cover if c not in shared]
+        return [c for c in shared if c in cover] + own
+
+    @staticmethod
+    def colors(cubes, shared):
+        """Return the color index of each of the cubes for
+        SVGGenerator.generate: the index in shared of a shared cube, so that
+        it has the same color in every map, and the following indices for
+        the other cubes."""
+        colors = []
+        own = len(shared)
+        for cube in cubes:
+            if cube in shared:
+                colors.append(shared.index(cube))
+            else:
+                colors.append(own)
+                own += 1
+        return colors
+
+
+class HeuristicMinimizer(object):
+    """Two-level minimization of wide functions by the loop of Espresso.
+
+    Functions of up to MAX_VARIABLES variables are given as truth table
+    masks, where bit m is set for minterm m as for TruthTable, and cubes are
+    Cubes of that many variables. A cover is improved by expand, irredundant
+    and reduce steps until its cost (cubes, then literals) stops decreasing,
+    or for at most the given number of iterations. The result is not always
+    minimal.
+
+    Each step is a pass over the cover with a few mask operations per cube,
+    so the time grows with the size of the cover times the 2 ** variables
+    bits of a mask. Ones not in the initial cover start out as minterms, so
+    the cover may also grow with 2 ** variables, and each added variable
+    then takes about four times as long. MAX_VARIABLES keeps this well
+    under a second.
+    """
+
+    MAX_VARIABLES = 12
+    ITERATIONS = 8
+
+    @staticmethod
+    def minimize(variables, ones, dontcares=0, cover=None,
+                 iterations=ITERATIONS):
+        """Return a cover of the ones, given as a mask, as a list of cubes.
+
+        An initial cover, e.g. the cubes of a PLA file, may be given.
+        Otherwise the minterms of ones are used. Cubes must not cover zeros,
+        and ones not covered by the initial cover are added as minterms.
+        """
+        _check_variables(variables, 1, HeuristicMinimizer.MAX_VARIABLES)
+        full = (1 << (1 << variables)) - 1
+        ones &= full
+        allowed = ones | dontcares & full
+        care = (1 << variables) - 1
+        if cover is None:
+            cover = []
+        covered = 0
+        for cube in cover:
+            if len(cube) != variables:
+                raise KarnaughError('Invalid input cubes.')
+            if cube.mask() & ~allowed:
+                raise KarnaughError('Cube {} covers zeros.'.format(cube))
+            covered |= cube.mask()
+        cover = list(cover) + [Cube(variables, m, care)
+                               for m in _minterms(ones & ~covered)]
+        step = HeuristicMinimizer
+        cover = step._irredundant(step._expand(cover, ones, allowed), ones)
+        best = cover
+        for _ in range(iterations):
+            cover = step._reduce(cover, ones)
+            cover = step._irredundant(step._expand(cover, ones, allowed),
+                                      ones)
+            if step._cost(cover) >= step._cost(best):
+                break
+            best = cover
+        return sorted(best, key=lambda c: (-c.size(), c.value, c.care))
+
+    @staticmethod
+    def project(cover, values, map_variables, assignment):
+        """Return the (cubes, values) of one 4-variable map of a function,
+        as expected by LaTeXGenerator.generate.
+
+        Values is a TruthTable, or (variables, ones, dontcares) with masks
+        as for minimize. Map_variables are the variable numbers of the map,
+        counting from 1 as x1, x2 and so on, in the order of the map, and
+        assignment maps each other variable number to 0 or 1, which selects
+        the map. The cubes are those of the cover that intersect the map,
+        restricted to its variables, without duplicates.
+        """
+        if isinstance(values, TruthTable):
+            values = (values.variables, values.ones, values.dontcares)
+        variables, ones, dontcares = values
+        others = set(range(1, variables + 1)) - set(map_variables)
+        if len(map_variables) != 4 or len(set(map_variables)) != 4 or \
+                not set(map_variables) <= set(range(1, variables + 1)) or \
+                set(assignment) != others:
+            raise KarnaughError('Invalid map variables or assignment.')
+        # Bit positions, where x1 is the most significant bit.
+        positions = [variables - v for v in map_variables]
+        base = 0
+        for v, bit in assignment.items():
+            if bit not in (0, 1):
+                raise KarnaughError('Invalid assignment of x{}.'.format(v))
+            base |= bit << (variables - v)
+        fixed = sum(1 << (variables - v) for v in others)
+        cubes = []
+        for cube in cover:
+            if (cube.value ^ base) & cube.care & fixed:
+                continue
+            value = care = 0
+            for i, position in enumerate(positions):
+                shift = 3 - i
+                value |= (cube.value >> position & 1) << shift
+                care |= (cube.care >> position & 1) << shift
+            projected = Cube(4, value, care)
+            if projected not in cubes:
+                cubes.append(projected)
+        chars = []
+        for minterm in range(16):
+            m = base
+            for i, position in enumerate(positions):
+                m |= (minterm >> (3 - i) & 1) << position
+            chars.append('1' if ones >> m & 1 else
+                         '-' if dontcares >> m & 1 else '0')
+        return cubes, ''.join(chars)
+
+    @staticmethod
+    def _expand(cover, ones, allowed):
+        """Make every cube as large as possible, largest cubes first, and
+        drop cubes whose ones are already covered."""
+        expanded = []
+        covered = 0
+        for cube in sorted(cover, key=lambda c: -c.size()):
+            mask = cube.mask()
+            if not mask & ones & ~covered:
+                continue
+            while True:
+                # Free the variable that covers the most new ones.
+                best = None
+                for i in range(cube.variables):
+                    if not cube.care >> i & 1:
+                        continue
+                    mirror = cube.mirror(i, mask)
+                    if mirror & ~allowed:
+                        continue
+                    gain = bin(mirror & ones & ~covered).count('1')
+                    if best is None or gain > best[0]:
+                        best = (gain, i, mirror)
+                if best is None:
+                    break
+                _, i, mirror = best
+                mask |= mirror
+                cube = Cube(cube.variables, cube.value, cube.care & ~(1 << i))
+            expanded.append(cube)
+            covered |= mask
+        return expanded
+
+    @staticmethod
+    def _irredundant(cover, ones):
+        """Remove cubes whose ones are covered by the other cubes, the
+        smallest first."""
+        cover = list(cover)
+        masks = [c.mask() & ones for c in cover]
+        while True:
+            once = twice = 0
+            for mask in masks:
+                twice |= once & mask
+                once |= mask
+            single = once & ~twice
+            redundant = [i for i, mask in enumerate(masks)
+                         if not mask & single]
+            if not redundant:
+                return cover
+            i = min(redundant, key=lambda i: cover[i].size())
+            del cover[i]
+            del masks[i]
+
+    @staticmethod
+    def _reduce(cover, ones):
+        """Shrink every cube to the smallest cube containing the ones that
+        only it covers, so that the next expand may take another
+        direction."""
+        bits = _bit_masks(cover[0].variables) if cover else []
+        masks = [c.mask() for c in cover]
+        suffix = [0] * (len(cover) + 1)
+        for i in range(len(cover) - 1, -1, -1):
+            suffix[i] = suffix[i + 1] | masks[i]
+        reduced = []
+        prefix = 0
+        for i, cube in enumerate(cover):
+            unique = masks[i] & ones & ~(prefix | suffix[i + 1])
+            if not unique:
+                continue
+            value = care = 0
+            for b, with_bit in enumerate(bits):
+                if not unique & with_bit:
+                    care |= 1 << b
+                elif not unique & ~with_bit:
+                    care |= 1 << b
+                    value |= 1 << b
+            cube = Cube(cube.variables, value, care)
+            reduced.append(cube)
+            prefix |= cube.mask()
+        return reduced
+
+    @staticmethod
+    def _cost(cover):
+        return len(cover), sum(c.literals() for c in cover)
+
+
+class PrimeTracker(object):
+    """Keeps the prime implicants of a function up to date while its values
+    are changed one at a time, e.g. as a Karnaugh map is edited.
+
+    Only primes covering at least one 1 are kept. Whether a cube is prime
+    depends only on the values of its minterms and of the cubes it expands
+    to by freeing one variable. A changed value can thus only affect cubes
+    containing the minterm or one of its neighbors, and only those cubes,
+    at most (variables + 1) * 2 ** variables, are checked.
+    """
+
+    def __init__(self, values):
+        table = TruthTable.parse(values)
+        self.variables = table.variables
+        self._ones = table.ones
+        self._allowed = table.ones | table.dontcares
+        primes = Minimizer.prime_implicants(self.variables,
+                                            _minterms(table.ones),
+                                            _minterms(table.dontcares))
+        self._primes = set(c for c in primes if c.mask() & self._ones)
+
+    def set(self, minterm, value):
+        """Set the value ('0', '1' or '-') of a minterm."""
+        if len(value) != 1 or value not in '01-':
+            raise KarnaughError('Invalid function value: {}'.format(value))
+        if not 0 <= minterm < 1 << self.variables:
+            raise KarnaughError('Invalid minterm: {}'.format(minterm))
+        bit = 1 << minterm
+        self._ones &= ~bit
+        self._allowed &= ~bit
+        if value == '1':
+            self._ones |= bit
+        if value != '0':
+            self._allowed |= bit
+        for cube in self._neighborhood(minterm):
+            if self._is_prime(cube):
+                self._primes.add(cube)
+            else:
+                self._primes.discard(cube)
+
+    def table(self):
+        """Return the current values as a TruthTable."""
+        return TruthTable(self.variables, self._ones,
+                          self._allowed & ~self._ones)
+
+    def primes(self):
+        """Return the prime implicants, largest first."""
+        return sorted(self._primes, key=self._order)
+
+    def essentials(self):
+        """Return the essential primes, i.e. those that alone cover a 1."""
+        once = twice = 0
+        for cube in self._primes:
+            mask = cube.mask()
+            twice |= once & mask
+            once |= mask
+        single = once & ~twice & self._ones
+        return sorted((c for c in self._primes if c.mask() & single),
+                      key=self._order)
+
+    def suggestion(self):
+        """Return a cover of the ones, of the essential primes and then
+        greedily the primes covering the most uncovered ones.
+
+        The cover is found quickly, but is not always minimal, unlike that
+        of Minimizer.minimize.
+        """
+        masks = dict((c, c.mask()) for c in self._primes)
+        cover = self.essentials()
+        uncovered = self._ones
+        for cube in cover:
+            uncovered &= ~masks[cube]
+        while uncovered:
+            best = max(masks, key=lambda c: (
+                bin(masks[c] & uncovered).count('1'), -c.literals(),
+                -c.value, -c.care))
+            cover.append(best)
+            uncovered &= ~masks[best]
+        return sorted(cover, key=self._order)
+
+    def _neighborhood(self, minterm):
+        """Return every cube containing the minterm or a neighbor of it."""
+        full = (1 << self.variables) - 1
+        cubes = set()
+        for m in [minterm] + [minterm ^ 1 << i
+                              for i in range(self.variables)]:
+            for care in range(full + 1):
+                cubes.add(Cube(self.variables, m & care, care))
+        return cubes
+
+    def _is_prime(self, cube):
+        mask = cube.mask()
+        if mask & ~self._allowed or not mask & self._ones:
+            return False
+        for i in range(self.variables):
+            if cube.care >> i & 1 and \
+                    not cube.mirror(i, mask) & ~self._allowed:
+                return False
+        return True
+
+    @staticmethod
+    def _order(cube):
+        return -cube.size(), cube.value, cube.care
+
+
+class CoverTable(object):
+    """Memory-mapped table of minimal covers of all 4-variable functions.
+
+    The table is indexed by the 16-bit truth table of the function, where bit
+    m is the value of minterm m. Each record holds up to 8 cubes, one byte per
+    cube with the care mask in the high and the value in the low nibble. The
+    table is generated by karnaughgen-buildtable.py.
+    """
+
+    VARIABLES = 4
+    MAGIC = b'KGCT'
+    VERSION = 1
+    HEADER = struct.Struct('<4sHHI4x')
+    RECORD_SIZE = 8
+    # Unused cube slots hold a value bit outside of the care mask, which is
+    # never the case for a real cube.
+    EMPTY = 0x0f
+    PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        'karnaughgen-covers.bin')
+    _default = None
+
+    def __init__(self, path=PATH):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        size = 2 ** 2 ** self.VARIABLES
+        header = (self.MAGIC, self.VERSION, self.RECORD_SIZE, size)
+        if len(self._mmap) != self.HEADER.size + size * self.RECORD_SIZE or \
+                self.HEADER.unpack_from(self._mmap) != header:
+            self._mmap.close()
+            raise KarnaughError('Invalid cover table: {}'.format(path))
+
+    @classmethod
+    def default(cls):
+        """Return the table shipped next to this module, or None if missing."""
+        if cls._default is None:
+            try:
+                CoverTable._default = cls()
+            except (IOError, OSError, ValueError, KarnaughError):
+                CoverTable._default = False
+        return cls._default or None
+
+    @staticmethod
+    def encode(cubes):
+        """Return the record for a list of 4-variable cubes."""
+        if len(cubes) > CoverTable.RECORD_SIZE:
+            raise KarnaughError('Too many cubes for a cover table record.')
+        record = bytearray([CoverTable.EMPTY] * CoverTable.RECORD_SIZE)
+        for i, c in enumerate(cubes):
+            record[i] = c.care << 4 | c.value
+        return bytes(record)
+
+    def lookup(self, index):
+        """Return the minimal cover of the function with the given index."""
+        offset = self.HEADER.size + index * self.RECORD_SIZE
+        record = bytearray(self._mmap[offset:offset + self.RECORD_SIZE])
+        return [Cube(self.VARIABLES, b & 0xf, b >> 4)
+                for b in record if b != self.EMPTY]
+
+    def close(self):
+        self._mmap.close()
+
+
+class CoverReport(object):
+    """The result of CoverVerifier.verify.
+
+    Uncovered is the list of minterms of the on-set not covered by any cube,
+    zeros maps each cube covering zeros to those minterms, and redundant and
+    nonprime are lists of cubes. Minimal is True if no cover of the function
+    has fewer cubes, or as many cubes with fewer literals.
+    """
+
+    __slots__ = ('uncovered', 'zeros', 'redundant', 'nonprime', 'minimal')
+
+    def __init__(self):
+        self.uncovered = []
+        self.zeros = {}
+        self.redundant = []
+        self.nonprime = []
+        self.minimal = False
+
+    @property
+    def valid(self):
+        """True if the cubes cover exactly the ones, up to don't cares."""
+        return not self.uncovered and not self.zeros
+
+    def as_dict(self):
+        return {'valid': self.valid,
+                'uncovered': self.uncovered,
+                'zeros': dict((str(c), m) for c, m in self.zeros.items()),
+                'redundant': [str(c) for c in self.redundant],
+                'nonprime': [str(c) for c in self.nonprime],
+                'minimal': self.minimal}
+
+    def __repr__(self):
+        return ('CoverReport(uncovered={!r}, zeros={!r}, redundant={!r}, '
+                'nonprime={!r}, minimal={!r})'.format(
+                    self.uncovered, self.zeros, self.redundant,
+                    self.nonprime, self.minimal))
+
+
+class CoverVerifier(object):
+    """Checks that a list of cubes is a correct cover of function values.
+
+    The function and every cube are turned into truth table bit masks, so
+    each check is a few integer operations per cube.
+    """
+
+    @staticmethod
+    def verify(cubes, values):
+        """Return a CoverReport of the cubes for the given values.
+
+        Values are given as for Minimizer.minimize.
+        """
+        cubes, variables, values = LaTeXGenerator._validate(cubes, values)
+        table = TruthTable.parse(values)
+        onset = table.ones
+        allowed = onset | table.dontcares
+        masks = [cube.mask() for cube in cubes]
+        report = CoverReport()
+        covered = 0
+        for mask in masks:
+            covered |= mask
+        report.uncovered = _minterms(onset & ~covered)
+        for cube, mask in zip(cubes, masks):
+            if mask & ~allowed:
+                report.zeros[cube] = _minterms(mask & ~allowed)
+        # A cube is redundant if the others cover all of its ones.
+        others = [0] * len(masks)
+        before = 0
+        for i, mask in enumerate(masks):
+            others[i] = before
+            before |= mask
+        after = 0
+        for i in range(len(masks) - 1, -1, -1):
+            others[i] |= after
+            after |= masks[i]
+        for cube, mask, rest in zip(cubes, masks, others):
+            if mask & onset & ~rest == 0:
+                report.redundant.append(cube)
+        # A cube is not prime if a fixed variable can be freed without
+        # covering any zeros.
+        for cube, mask in zip(cubes, masks):
+            if mask & ~allowed == 0 and any(
+                    cube.mirror(i, mask) & ~allowed == 0
+                    for i in range(variables) if cube.care >> i & 1):
+                report.nonprime.append(cube)
+        # Covers with redundant or non-prime cubes cannot be minimal.
+        if report.valid and not report.redundant and not report.nonprime:
+            best = Minimizer.minimize(table)
+            report.minimal = (
+                (len(cubes), sum(c.literals() for c in cubes)) <=
+                (len(best), sum(c.literals() for c in best)))
+        return report
+
+
+class PLA(object):
+    """A multiple-output function read from a Berkeley PLA file, the format
+    of Espresso.
+
+    The file is read line by line, from a memory map if it is given by its
+    path, and only the truth table masks of each output (see TruthTable) and
+    the cubes of its on-set are kept. The .i, .o, .ilb, .ob and .type
+    directives are supported, where the .ilb names of the inputs may be used
+    to select the variables of submaps, and others such as .p are ignored.
+    Inputs '-' of a term are B in its cube. Minterms in both the on-set and
+    the don't care set are don't cares.
+    """
+
+    TYPES = ('f', 'fd', 'fr', 'fdr')
+    # Output chars of a term, by the set they add the term to.
+    ON, OFF, DONTCARE = '14', '03', '-2'
+
+    def __init__(self, inputs, names, onsets, dontcares, cubes,
+                 input_names=None):
+        self.inputs = inputs
+        self.names = names
+        # The names of the inputs x1, x2, ..., or None if not given.
+        self.input_names = input_names
+        self.onsets = onsets
+        self.dontcares = dontcares
+        self.cubes = cubes
+
+    @classmethod
+    def read(cls, f):
+        """Return the PLA of a path or an open file."""
+        if hasattr(f, 'readline'):
+            return cls._parse(f)
+        with open(f, 'rb') as pla_file:
+            if os.fstat(pla_file.fileno()).st_size == 0:
+                return cls._parse([])
+            mapped = mmap.mmap(pla_file.fileno(), 0,
+                               access=mmap.ACCESS_READ)
+            try:
+                return cls._parse(iter(mapped.readline, b''))
+            finally:
+                mapped.close()
+
+    @classmethod
+    def _parse(cls, lines):
+        inputs = outputs = None
+        names = input_names = None
+        kind = 'fd'
+        terms = None
+        number = 0
+        for number, line in enumerate(lines, 1):
+            if not isinstance(line, str):
+                line = line.decode('ascii', 'replace')
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+            if line.startswith('.'):
+                words = line.split()
+                directive, args = words[0], words[1:]
+                if directive in ('.e', '.end'):
+                    break
+                try:
+                    if directive == '.i':
+                        inputs = int(args[0])
+                    elif directive == '.o':
+                        outputs = int(args[0])
+                    elif directive == '.ob':
+                        names = args
+                    elif directive == '.ilb':
+                        input_names = args
+                    elif directive == '.type':
+                        kind = args[0]
+                except (IndexError, ValueError):
+                    raise KarnaughError('line {}: invalid {}'.format(
+                        number, directive))
+                if kind not in cls.TYPES or directive in ('.mv', '.kiss'):
+                    raise KarnaughError('line {}: unsupported {}'.format(
+                        number, ' '.join(words)))
+                continue
+            if terms is None:
+                terms = cls._start(number, inputs, outputs)
+            cls._add_term(terms, number, ''.join(line.split()), inputs)
+        if terms is None:
+            terms = cls._start(number, inputs, outputs)
+        onsets, offsets, dontcares, cubes = terms
+        if names is None:
+            names = ['f{}'.format(j + 1) for j in range(outputs)]
+        elif len(names) != outputs:
+            raise KarnaughError('.ob does not match .o')
+        if input_names is not None and len(input_names) != inputs:
+            raise KarnaughError('.ilb does not match .i')
+        full = (1 << (1 << inputs)) - 1
+        for j in range(outputs):
+            if 'r' in kind:
+                dontcares[j] |= full & ~(onsets[j] | offsets[j])
+            elif 'd' not in kind:
+                dontcares[j] = 0
+            onsets[j] &= ~dontcares[j]
+        return cls(inputs, names, onsets, dontcares, cubes, input_names)
+
+    @staticmethod
+    def _start(number, inputs, outputs):
+        if inputs is None or outputs is None:
+            raise KarnaughError('line {}: .i and .o must come before the '
+                                'terms'.format(number))
+        if not 1 <= inputs <= MAX_TABLE_VARIABLES or outputs < 1:
+            raise KarnaughError('line {}: unsupported size of {} inputs and '
+                                '{} outputs'.format(number, inputs, outputs))
+        return ([0] * outputs, [0] * outputs, [0] * outputs,
+                [[] for _ in range(outputs)])
+
+    @classmethod
+    def _add_term(cls, terms, number, term, inputs):
+        onsets, offsets, dontcares, cubes = terms
+        chars = term[:inputs].replace('-', 'B').replace('2', 'B')
+        if len(term) != inputs + len(onsets) or chars.strip('01B'):
+            raise KarnaughError('line {}: invalid term'.format(number))
+        value = int(chars.replace('B', '0'), 2)
+        care = int(chars.replace('0', '1').replace('B', '0'), 2)
+        cube = Cube(inputs, value, care)
+        mask = cube.mask()
+        for j, c in enumerate(term[inputs:]):
+            if c in cls.ON:
+                onsets[j] |= mask
+                cubes[j].append(cube)
+            elif c in cls.OFF:
+                offsets[j] |= mask
+            elif c in cls.DONTCARE:
+                dontcares[j] |= mask
+            elif c != '~':
+                raise KarnaughError('line {}: invalid term'.format(number))
+
+    def maps(self, outputs=None, minimize=False):
+        """Yield (name, cubes, values) of each output, as expected by
+        LaTeXGenerator.generate, where values is a TruthTable.
+
+        Outputs may select outputs by name or index. The cubes are the terms
+        of the on-set of the output, or a minimal cover if minimize is True.
+        Maps are only drawn of functions of up to MAX_VARIABLES inputs; for
+        wider functions, see submaps.
+        """
+        if not 2 <= self.inputs <= MAX_VARIABLES:
+            raise KarnaughError('Cannot draw maps of {} inputs, select '
+                                'submaps instead.'.format(self.inputs))
+        indices = range(len(self.names))
+        if outputs is not None:
+            indices = [self._index(o) for o in outputs]
+        for j in indices:
+            table = TruthTable(self.inputs, self.onsets[j],
+                               self.dontcares[j])
+            cubes = Minimizer.minimize(table) if minimize else self.cubes[j]
+            yield self.names[j], cubes, table
+
+    def submaps(self, map_inputs, assignment, outputs=None, minimize=False):
+        """Yield (name, cubes, values) of a 4-variable submap of each
+        output, as for maps, where values is a string.
+
+        Map_inputs are the four inputs of the map, and assignment maps each
+        other input to 0 or 1, selecting the submap. Inputs are given by
+        number, counting from 1, or by name as x1, x2, ... or as in .ilb.
+        The cubes are the terms of the output or, if minimize is True, a
+        cover by HeuristicMinimizer, projected by HeuristicMinimizer.project.
+        Only functions of up to HeuristicMinimizer.MAX_VARIABLES inputs can
+        be minimized.
+        """
+        if minimize and self.inputs > HeuristicMinimizer.MAX_VARIABLES:
+            raise KarnaughError('Cannot minimize functions of more than {} '
+                                'inputs.'.format(
+                                    HeuristicMinimizer.MAX_VARIABLES))
+        map_variables = [self._input(i) for i in map_inputs]
+        bits = {}
+        for i, bit in assignment.items():
+            if bit not in (0, 1, '0', '1'):
+                raise KarnaughError('Invalid assignment of {}.'.format(i))
+            bits[self._input(i)] = int(bit)
+        indices = range(len(self.names))
+        if outputs is not None:
+            indices = [self._index(o) for o in outputs]
+        for j in indices:
+            cover = self.cubes[j]
+            if minimize:
+                cover = HeuristicMinimizer.minimize(
+                    self.inputs, self.onsets[j], self.dontcares[j], cover)
+            cubes, values = HeuristicMinimizer.project(
+                cover, (self.inputs, self.onsets[j], self.dontcares[j]),
+                map_variables, bits)
+            yield self.names[j], cubes, values
+
+    def _input(self, name):
+        """Return the variable number of an input."""
+        if self.input_names is not None and name in self.input_names:
+            return self.input_names.index(name) + 1
+        if hasattr(name, 'split') and name[:1] in ('x', 'X') and \
+                name[1:].isdigit():
+            name = int(name[1:])
+        if isinstance(name, int) and 1 <= name <= self.inputs:
+            return name
+        raise KarnaughError('No input {}'.format(name))
+
+    def _index(self, output):
+        if output in self.names:
+            return self.names.index(output)
+        if isinstance(output, int) and 0 <= output < len(self.names):
+            return output
+        raise KarnaughError('No output {}'.format(output))
+
+
+class BatchRenderer(object):
+    """Renders a stream of maps, one job per line of JSONL or CSV input.
+
+    A JSONL job is an object with the keys values, cubes (a list or a space
+    separated string), minimize, id, caption and label, where all but values
+    are optional. Instead of values, the hex form of TruthTable may be given
+    as values_hex and dc_hex, or an Expression as expr, with as many
+    variables as the cubes if given. A CSV job is a row of values and space
+    separated cubes, optionally preceded by a header row. CSV values with a
+    0x prefix are in hex form, followed by an optional third field of don't
+    cares in hex form. Each job gives one result, a dict
+    with the line number, the id, caption and label if given, and either the
+    generated latex or an error. When verifying, the result has the report
+    of CoverVerifier.verify instead of the latex.
+    """
+
+    # Keys of a job that are copied to its result.
+    ECHO_KEYS = ('id', 'caption', 'label')
+
+    FORMATS = ('jsonl', 'csv')
+
+    @staticmethod
+    def read(f, fmt='jsonl'):
+        """Yield (line number, line) for every job line of the file."""
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            if fmt == 'csv' and number == 1 and line.startswith('values,'):
+                continue
+            yield number, line
+
+    @staticmethod
+    def render(number, line, fmt='jsonl', minimize=False, writer=None,
+               verify=False):
+        """Return the result of a single job line.
+
+        If a writer is given, the code is written to it with
+        LaTeXGenerator.generate_into instead of being added to the result.
+        """
+        import csv
+        import json
+        result = {'line': number}
+        try:
+            if fmt == 'csv':
+                row = next(csv.reader([line]))
+                job = {'values': row[0],
+                       'cubes': row[1] if len(row) > 1 else ''}
+                if row[0][:2].lower() == '0x':
+                    job['values_hex'] = row[0]
+                    job['dc_hex'] = row[2] if len(row) > 2 else None
+            else:
+                job = json.loads(line)
+                if not isinstance(job, dict):
+                    raise KarnaughError('Job is not a JSON object.')
+                for key in BatchRenderer.ECHO_KEYS:
+                    if key in job:
+                        result[key] = job[key]
+            cubes = job.get('cubes') or []
+            if hasattr(cubes, 'split'):
+                cubes = cubes.split()
+            if not BatchRenderer._strings(cubes):
+                raise KarnaughError('Invalid job cubes.')
+            values = job.get('values')
+            if values is not None and not hasattr(values, 'split') and \
+                    not BatchRenderer._strings(values):
+                raise KarnaughError('Invalid job values.')
+            for key in ('values_hex', 'dc_hex', 'expr'):
+                if job.get(key) is not None and \
+                        not hasattr(job[key], 'split'):
+                    raise KarnaughError('Invalid job {}.'.format(key))
+            if job.get('values_hex') is not None:
+                values = TruthTable.from_hex(job['values_hex'],
+                                             job.get('dc_hex'))
+            elif job.get('expr') is not None:
+                variables = len(str(cubes[0])) if cubes else None
+                values = Expression.parse(job['expr']).table(variables)
+            if not values:
+                raise KarnaughError('Job has no values.')
+            if not cubes and job.get('minimize', minimize):
+                cubes = Minimizer.minimize(values)
+            if verify:
+                report = CoverVerifier.verify(cubes, values)
+                result['report'] = report.as_dict()
+            elif writer is None:
+                result['latex'] = LaTeXGenerator.generate(cubes, values)
+            else:
+                LaTeXGenerator.generate_into(writer, cubes, values)
+        except (KarnaughError, ValueError, TypeError) as e:
+            result['error'] = str(e)
+        except EnvironmentError:
+            # Errors writing to the writer are not errors of the job.
+            raise
+        except Exception as e:
+            # Any other error, e.g. RecursionError for deeply nested JSON,
+            # must not stop the other jobs either.
+            result['error'] = '{}: {}'.format(type(e).__name__, e)
+        return result
+
+    @staticmethod
+    def _strings(items):
+        """Return whether items is a list of strings."""
+        return isinstance(items, list) and \
+            all(hasattr(item, 'split') for item in items)
+
+    @staticmethod
+    def run(lines, fmt='jsonl', minimize=False, jobs=1, ordered=True,
+            chunksize=64, verify=False):
+        """Yield the results of the (line number, line) pairs in lines.
+
+        With more than one job, chunks of lines are rendered by a process
+        pool. Only a few chunks per worker are in flight at any time, so
+        memory use does not depend on the input size. Unless ordered is
+        False, results are yielded in input order. An error of a worker,
+        rather than of a job, is raised.
+        """
+        chunks = BatchRenderer._chunks(lines, chunksize)
+        if jobs <= 1:
+            for chunk in chunks:
+                for result in _render_chunk(chunk, fmt, minimize, verify):
+                    yield result
+            return
+        import collections
+        import multiprocessing
+        try:
+            import queue
+        except ImportError:
+            import Queue as queue
+        window = 2 * jobs
+        pool = multiprocessing.Pool(jobs)
+        try:
+            if ordered:
+                pending = collections.deque()
+                for chunk in chunks:
+                    pending.append(pool.apply_async(
+                        _render_chunk, (chunk, fmt, minimize, verify)))
+                    if len(pending) >= window:
+                        for result in pending.popleft().get():
+                            yield result
+                while pending:
+                    for result in pending.popleft().get():
+                        yield result
+            else:
+                done = queue.Queue()
+                inflight = 0
+                for chunk in chunks:
+                    pool.apply_async(_render_chunk,
+                                     (chunk, fmt, minimize, verify),
+                                     callback=done.put,
+                                     error_callback=done.put)
+                    inflight += 1
+                    while inflight >= window:
+                        for result in BatchRenderer._done(done):
+                            yield result
+                        inflight -= 1
+                while inflight:
+                    for result in BatchRenderer._done(done):
+                        yield result
+                    inflight -= 1
+            pool.close()
+        finally:
+            pool.terminate()
+            pool.join()
+
+    @staticmethod
+    def _done(done):
+        """Return the next results of the queue of finished chunks, which
+        also gets the exceptions of failed chunks."""
+        results = done.get()
+        if isinstance(results, BaseException):
+            raise results
+        return results
+
+    @staticmethod
+    def _chunks(iterable, size):
+        iterator = iter(iterable)
+        while True:
+            chunk = list(itertools.islice(iterator, size))
+            if not chunk:
+                return
+            yield chunk
+
+
+class DocumentAssembler(object):
+    """Assembles rendered maps into a single LaTeX document.
+
+    The maps are laid out in a grid with the given number of columns, each
+    with an optional caption and label. The results are those of
+    BatchRenderer, and are written in the order they are given.
+    """
+
+    HEADER = ('\\documentclass{{{}}}\n'
+              '\\usepackage{{Karnaugh}}\n'
+              '\\usepackage{{caption}}\n'
+              '{}'
+              '\\begin{{document}}\n'
+              '\\noindent\n')
+    FOOTER = '\n\\end{document}\n'
+
+    def __init__(self, columns=2, documentclass='article', preamble=''):
+        if columns < 1:
+            raise KarnaughError('Column count must be at least 1.')
+        self.columns = columns
+        self.documentclass = documentclass
+        self.preamble = preamble
+
+    def assemble(self, results, writer):
+        """Write the document of all results to writer.
+
+        Raise KarnaughError at the first result that is an error, before
+        anything is written, so that no truncated document is left behind.
+        """
+        results = list(results)
+        for result in results:
+            if 'error' in result:
+                raise KarnaughError('line {}: {}'.format(result['line'],
+                                                         result['error']))
+        writer.write(self.HEADER.format(self.documentclass, self.preamble))
+        width = '{:.3f}\\linewidth'.format(1.0 / self.columns)
+        for index, result in enumerate(results):
+            if index > 0 and index % self.columns == 0:
+                # Start a new row.
+                writer.write('\n\\medskip\n\n\\noindent\n')
+            writer.write('\\begin{{minipage}}[t]{{{}}}\n'
+                         '\\centering\n'.format(width))
+            writer.write(result['latex'])
+            if 'caption' in result:
+                writer.write('\\captionof{{figure}}{{{}}}\n'.format(
+                    result['caption']))
+            if 'label' in result:
+                writer.write('\\label{{{}}}\n'.format(result['label']))
+            writer.write('\\end{minipage}%\n')
+        writer.write(self.FOOTER)
+
+
+def _select_cover(job):
+    """Select the cover of one output. Used by MultiOutputMinimizer, also
+    in worker processes, so the job is plain data: the variable count, a
+    list of (value, care, weight) of the candidate primes, and the mask of
+    ones."""
+    variables, candidates, ones = job
+    primes = [Cube(variables, v, c) for v, c, _ in candidates]
+    cover = Minimizer.minimal_cover(primes, _minterms(ones),
+                                    [w for _, _, w in candidates])
+    return [(cube.value, cube.care) for cube in cover]
+
+
+def _render_chunk(chunk, fmt, minimize, verify=False):
+    """Render a list of job lines. Used by the BatchRenderer worker pool."""
+    return [BatchRenderer.render(number, line, fmt, minimize, verify=verify)
+            for number, line in chunk]
@@ -8,7 +8,7 @@ Usage:
 from setuptools import setup
 
 APP = ['karnaughgen-gui.py']
-DATA_FILES = []
+DATA_FILES = ['karnaughgen-covers.bin']
 OPTIONS = {'argv_emulation': True}
 
 setup(
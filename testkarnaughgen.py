@@ -29,8 +29,20 @@
 # ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF
 # THE POSSIBILITY OF SUCH DAMAGE.
 
-import karnaughgen
+import io
+import itertools
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
 import unittest
+import xml.etree.ElementTree
+
+import karnaughgen
 
 
 class TestLaTeXGenerator(unittest.TestCase):
@@ -151,5 +163,1272 @@ class TestLaTeXGenerator(unittest.TestCase):
                     '\\end{picture}\n')
         self.assertEqual(expected, karnaughgen.LaTeXGenerator.generate(*i))
 
+    def test_cube_table(self):
+        generate_cube = karnaughgen.LaTeXGenerator.generate_cube
+        for n in range(2, 7):
+            for s in itertools.product('01B', repeat=n):
+                generate_cube(''.join(s))
+        table = karnaughgen.LaTeXGenerator.CUBES
+        self.assertEqual(sum(3 ** n for n in range(2, 7)), len(table))
+        for cube, code in table.items():
+            self.assertEqual(
+                karnaughgen.LaTeXGenerator.build_cube(str(cube)), code)
+
+    def test_latex_generator_5var(self):
+        expected = ('\\begin{picture}(120,60)(0,0)\n'
+                    '\\put(0,10){\n'
+                    '\\put(0,0){\\Karnaughdiagram{4}{0000000000000000}'
+                    '($x_2 x_3$, $x_4 x_5$)[$f$]}\n'
+                    '\\put(30,-6){\\makebox(0,0){$x_1 = 0$}}\n'
+                    '\\put(60,0){\\Karnaughdiagram{4}{0000000000000001}'
+                    '($x_2 x_3$, $x_4 x_5$)[$f$]}\n'
+                    '\\put(90,-6){\\makebox(0,0){$x_1 = 1$}}\n'
+                    '\\PrimImpl(95,20)(8,38)\n'
+                    '}\n'
+                    '\\end{picture}\n')
+        self.assertEqual(expected, karnaughgen.LaTeXGenerator.generate(
+            ['1BB11'], '0' * 31 + '1'))
+
+    def test_submap_geometry(self):
+        geometry = karnaughgen.LaTeXGenerator.cube_geometry
+        # x1 selects the row of submaps, and x2 the column.
+        self.assertEqual([(35, 75, 8, 8, ''), (35, 15, 8, 8, '')],
+                         geometry('B01111'))
+        self.assertEqual([(x + 60, y, w, h, mod)
+                          for x, y, w, h, mod in geometry('B0B0')],
+                         geometry('11B0B0'))
+        self.assertEqual(geometry('0110') + [(x + 60, y, w, h, mod) for
+                                             x, y, w, h, mod in
+                                             geometry('0110')],
+                         geometry('B0110'))
+
+    def test_invalid_cube(self):
+        for cube in ['', '2', 'B', '0B1B0B1', '0b01']:
+            self.assertRaises(karnaughgen.KarnaughError,
+                              karnaughgen.LaTeXGenerator.generate_cube, cube)
+
+    def test_generate_chunks(self):
+        i = (['BB1B', 'B01B', '0000'], '0000000000000000')
+        chunks = list(karnaughgen.LaTeXGenerator.generate_chunks(*i))
+        self.assertEqual(karnaughgen.LaTeXGenerator.generate(*i),
+                         ''.join(chunks))
+        self.assertRaises(karnaughgen.KarnaughError,
+                          karnaughgen.LaTeXGenerator.generate_chunks,
+                          ['BB1B'], '0000')
+
+    def test_generate_into(self):
+        i = (['BB1', '1B0'], '00000000')
+        writer = io.StringIO()
+        karnaughgen.LaTeXGenerator.generate_into(writer, *i)
+        self.assertEqual(karnaughgen.LaTeXGenerator.generate(*i),
+                         writer.getvalue())
+
+    def test_latex_generator_cube_objects(self):
+        cubes = [karnaughgen.Cube.parse(c) for c in ['BB1B', 'B01B']]
+        values = '0000000000000000'
+        self.assertEqual(
+            karnaughgen.LaTeXGenerator.generate(['BB1B', 'B01B'], values),
+            karnaughgen.LaTeXGenerator.generate(cubes, values))
+
+
+class TestCube(unittest.TestCase):
+
+    def test_parse_format(self):
+        for s in ['00', 'BB', '1B0', 'B0B0', '0110', 'BBBB']:
+            self.assertEqual(s, str(karnaughgen.Cube.parse(s)))
+
+    def test_parse_invalid(self):
+        for s in ['', '0', '01234', '0b01', 'BBBBBBB', 'x1']:
+            self.assertRaises(karnaughgen.KarnaughError,
+                              karnaughgen.Cube.parse, s)
+
+    def test_equality(self):
+        a = karnaughgen.Cube.parse('B01B')
+        b = karnaughgen.Cube.parse('B01B')
+        self.assertEqual(a, b)
+        self.assertEqual(hash(a), hash(b))
+        self.assertNotEqual(a, karnaughgen.Cube.parse('B01'))
+        self.assertNotEqual(a, 'B01B')
+
+    def test_size_and_minterms(self):
+        cube = karnaughgen.Cube.parse('B0B1')
+        self.assertEqual(4, cube.size())
+        self.assertEqual([0b0001, 0b0011, 0b1001, 0b1011],
+                         list(cube.minterms()))
+        self.assertTrue(all(cube.covers(m) for m in cube.minterms()))
+        self.assertFalse(cube.covers(0b0101))
+
+    def test_mask(self):
+        for s in ['B0B1', '111', 'BB', '0B1B0B']:
+            cube = karnaughgen.Cube.parse(s)
+            self.assertEqual(sum(1 << m for m in cube.minterms()),
+                             cube.mask())
+
+    def test_mirror(self):
+        cube = karnaughgen.Cube.parse('B0B1')
+        # Bit 0 is x4 and bit 2 is x2.
+        self.assertEqual(karnaughgen.Cube.parse('B0B0').mask(),
+                         cube.mirror(0))
+        self.assertEqual(karnaughgen.Cube.parse('B1B1').mask(),
+                         cube.mirror(2, cube.mask()))
+
+    def test_contains(self):
+        big = karnaughgen.Cube.parse('BB1B')
+        self.assertTrue(big.contains(karnaughgen.Cube.parse('0B10')))
+        self.assertTrue(big.contains(big))
+        self.assertFalse(big.contains(karnaughgen.Cube.parse('B00B')))
+
+    def test_merge(self):
+        a = karnaughgen.Cube.parse('0B01')
+        b = karnaughgen.Cube.parse('1B01')
+        self.assertTrue(a.adjacent(b))
+        self.assertEqual(karnaughgen.Cube.parse('BB01'), a.merge(b))
+        self.assertRaises(karnaughgen.KarnaughError,
+                          a.merge, karnaughgen.Cube.parse('1B11'))
+
+    def test_from_mask(self):
+        for s in ['B0B0', '0110', 'BB', '1BB0B1']:
+            cube = karnaughgen.Cube.parse(s)
+            self.assertEqual(cube, karnaughgen.Cube.from_mask(len(s),
+                                                              cube.mask()))
+        # Three cells, and two cells that are not adjacent.
+        self.assertIsNone(karnaughgen.Cube.from_mask(2, 0b0111))
+        self.assertIsNone(karnaughgen.Cube.from_mask(3, 0b10000001))
+        self.assertIsNone(karnaughgen.Cube.from_mask(3, 0))
+        self.assertRaises(karnaughgen.KarnaughError,
+                          karnaughgen.Cube.from_mask, 7, 1)
+
+
+class TestTruthTable(unittest.TestCase):
+
+    def test_parse(self):
+        table = karnaughgen.TruthTable.parse('-1-11-1-00000001')
+        self.assertEqual(4, table.variables)
+        self.assertEqual(0x805a, table.ones)
+        self.assertEqual(0x00a5, table.dontcares)
+        self.assertEqual(0x7f00, table.zeros())
+        self.assertEqual(16, len(table))
+        self.assertEqual('-1-11-1-00000001', str(table))
+        cells = list('-1-11-1-') + ['0'] * 7 + ['1']
+        self.assertEqual(table, karnaughgen.TruthTable.parse(cells))
+
+    def test_hex(self):
+        table = karnaughgen.TruthTable.parse('-1-11-1-00000001')
+        self.assertEqual(('805a', '00a5'), table.hex())
+        self.assertEqual(table, karnaughgen.TruthTable.from_hex('805a',
+                                                                '0x00A5'))
+        for values in ['0001', '01100110', '0' * 31 + '1', '1' * 64]:
+            table = karnaughgen.TruthTable.parse(values)
+            self.assertEqual(table,
+                             karnaughgen.TruthTable.from_hex(*table.hex()))
+        self.assertEqual('0001', str(karnaughgen.TruthTable.from_hex('8')))
+
+    def test_equality(self):
+        a = karnaughgen.TruthTable.parse('01-0')
+        self.assertEqual(a, karnaughgen.TruthTable(2, 2, 4))
+        self.assertEqual(hash(a), hash(karnaughgen.TruthTable(2, 2, 4)))
+        self.assertNotEqual(a, karnaughgen.TruthTable(2, 2))
+        self.assertNotEqual(a, '01-0')
+
+    def test_invalid(self):
+        TruthTable = karnaughgen.TruthTable
+        for values in ['01', '010', '01x0', '0' * 128]:
+            self.assertRaises(karnaughgen.KarnaughError, TruthTable.parse,
+                              values)
+        for ones, dontcares in [('805', None), ('0x', None), ('zz', None),
+                                ('805a', '0a'), ('805a', '0002')]:
+            self.assertRaises(karnaughgen.KarnaughError, TruthTable.from_hex,
+                              ones, dontcares)
+        self.assertRaises(karnaughgen.KarnaughError, TruthTable, 2, 16)
+
+    def test_generators(self):
+        values = '-1-11-1-00000001'
+        table = karnaughgen.TruthTable.parse(values)
+        self.assertEqual(karnaughgen.Minimizer.minimize(values),
+                         karnaughgen.Minimizer.minimize(table))
+        self.assertEqual(
+            karnaughgen.LaTeXGenerator.generate(['0BBB', 'B111'], values),
+            karnaughgen.LaTeXGenerator.generate(['0BBB', 'B111'], table))
+
+    def test_batch(self):
+        render = karnaughgen.BatchRenderer.render
+        expected = render(1, '{"values": "-1-11-1-00000001", '
+                          '"cubes": "0BBB B111"}')
+        self.assertEqual(expected, render(1, '{"values_hex": "805a", '
+                                          '"dc_hex": "00a5", '
+                                          '"cubes": "0BBB B111"}'))
+        self.assertEqual(expected, render(1, '0x805a,0BBB B111,0x00a5',
+                                          'csv'))
+
+
+class TestExpression(unittest.TestCase):
+
+    def test_table(self):
+        expr = karnaughgen.Expression.parse("x1 x2' + x3 (x4 + x1')")
+        self.assertEqual(4, expr.variables)
+        # Compare with evaluating the expression row by row.
+        rows = itertools.product([False, True], repeat=4)
+        values = ''.join('1' if x1 and not x2 or x3 and (x4 or not x1)
+                         else '0' for x1, x2, x3, x4 in rows)
+        self.assertEqual(values, str(expr.table()))
+
+    def test_syntax(self):
+        cases = [('x1', 2, '0011'), ('~x1 * x2', 2, '0100'),
+                 ("!(x1 | x2)'", 2, '0111'), ("x2''", 2, '0101'),
+                 ('x1 & x2 + 0', 2, '0001'), ('1', 3, '11111111'),
+                 ('X3x1', 3, '00000101')]
+        for text, variables, values in cases:
+            expr = karnaughgen.Expression.parse(text)
+            self.assertEqual(values, str(expr.table(variables)))
+
+    def test_wide(self):
+        expr = karnaughgen.Expression.parse('x1 x20')
+        self.assertEqual(20, expr.variables)
+        mask = expr.mask(20)
+        self.assertEqual(2 ** 18, bin(mask).count('1'))
+        self.assertTrue(mask >> (2 ** 20 - 1) & 1)
+        self.assertRaises(karnaughgen.KarnaughError, expr.table)
+        self.assertRaises(karnaughgen.KarnaughError, expr.mask,
+                          karnaughgen.MAX_TABLE_VARIABLES + 1)
+
+    def test_invalid(self):
+        for text in ['', 'x1 +', '(x1', 'x1)', 'x', 'x0', 'x21', 'y1',
+                     "'x1", 'x1 ++ x2']:
+            self.assertRaises(karnaughgen.KarnaughError,
+                              karnaughgen.Expression.parse, text)
+        expr = karnaughgen.Expression.parse('x1 x5')
+        self.assertRaises(karnaughgen.KarnaughError, expr.table, 4)
+
+    def test_batch(self):
+        render = karnaughgen.BatchRenderer.render
+        self.assertEqual(render(1, '{"values": "00000101", "cubes": "1B1"}'),
+                         render(1, '{"expr": "x1 x3", "cubes": "1B1"}'))
+        # The cubes give the variable count.
+        self.assertEqual(render(1, '{"values": "0101", "cubes": "B1"}'),
+                         render(1, '{"expr": "x2", "cubes": "B1"}'))
+        self.assertIn('error', render(1, '{"expr": "x1 x3", "cubes": "B1"}'))
+
+
+class TestMapLayout(unittest.TestCase):
+
+    def test_shape(self):
+        for variables, rows, columns in [(2, 2, 2), (3, 2, 4), (4, 4, 4)]:
+            layout = karnaughgen.MapLayout(variables)
+            self.assertEqual((rows, columns), (layout.rows, layout.columns))
+            self.assertEqual(list(range(2 ** variables)),
+                             sorted(layout.minterms))
+
+    def test_minterms(self):
+        layout = karnaughgen.MapLayout(4)
+        self.assertEqual(int('1110', 2), layout.minterms[2 * 4 + 3])
+        self.assertEqual(int('101', 2),
+                         karnaughgen.MapLayout(3).minterms[1 * 4 + 1])
+
+    def test_mask(self):
+        layout = karnaughgen.MapLayout(4)
+        # The corners of the map, wrapping around both edges.
+        corners = layout.mask([(0, 0), (0, 3), (3, 0), (3, 3)])
+        self.assertEqual(karnaughgen.Cube.parse('B0B0').mask(), corners)
+        self.assertEqual(0, layout.mask([]))
+
+    def test_submaps(self):
+        for variables, rows, columns in [(5, 4, 8), (6, 8, 8)]:
+            layout = karnaughgen.MapLayout(variables)
+            self.assertEqual((rows, columns), (layout.rows, layout.columns))
+            self.assertEqual(list(range(2 ** variables)),
+                             sorted(layout.minterms))
+        # The leading bits of the labels select the submap.
+        self.assertEqual(int('11101', 2),
+                         karnaughgen.MapLayout(5).minterms[2 * 8 + 5])
+        self.assertEqual(int('011101', 2),
+                         karnaughgen.MapLayout(6).minterms[2 * 8 + 5])
+
+    def test_invalid(self):
+        for variables in [1, 7]:
+            self.assertRaises(karnaughgen.KarnaughError,
+                              karnaughgen.MapLayout, variables)
+
+
+class TestMapValues(unittest.TestCase):
+
+    def test_set(self):
+        cells = karnaughgen.MapValues(4)
+        self.assertTrue(cells.set(2, 3, '1'))
+        self.assertFalse(cells.set(2, 3, '1'))
+        self.assertEqual('1', cells.get(2, 3))
+        # The cell of row 2 and column 3 is minterm 1110.
+        self.assertEqual(b'1', bytes(cells.buffer()[0b1110:0b1111]))
+        self.assertEqual(karnaughgen.TruthTable(4, 1 << 0b1110),
+                         cells.values())
+        for value in ['2', '', '01']:
+            self.assertRaises(karnaughgen.KarnaughError, cells.set, 0, 0,
+                              value)
+
+    def test_undo_redo(self):
+        cells = karnaughgen.MapValues(3)
+        cells.set(0, 0, '1')
+        cells.set(1, 2, '-')
+        self.assertEqual([(1, 2)], cells.undo())
+        self.assertEqual('10000000', str(cells.values()))
+        self.assertEqual([(0, 0)], cells.undo())
+        self.assertEqual([], cells.undo())
+        self.assertEqual([(0, 0)], cells.redo())
+        cells.set(1, 1, '1')
+        # A new change drops the undone changes.
+        self.assertEqual([], cells.redo())
+
+    def test_snapshot(self):
+        cells = karnaughgen.MapValues(2)
+        cells.set(0, 1, '1')
+        snapshot = cells.snapshot()
+        self.assertEqual(b'0100', snapshot)
+        cells.set(1, 0, '1')
+        cells.set(0, 1, '0')
+        self.assertEqual([(0, 1), (1, 0)], cells.restore(snapshot))
+        self.assertEqual('0100', str(cells.values()))
+        self.assertEqual([(0, 1), (1, 0)], cells.undo())
+        self.assertRaises(karnaughgen.KarnaughError, cells.restore, b'010')
+
+
+class TestSVGGenerator(unittest.TestCase):
+
+    NS = '{http://www.w3.org/2000/svg}'
+
+    def parse(self, cubes, values):
+        svg = karnaughgen.SVGGenerator.generate(cubes, values)
+        return xml.etree.ElementTree.fromstring(svg)
+
+    def implicants(self, root):
+        group = root.find(self.NS + 'g')
+        return [tuple(float(r.get(k)) for k in ('x', 'y', 'width', 'height'))
+                for r in group.findall(self.NS + 'rect')]
+
+    def test_values(self):
+        root = self.parse(['01'], '01-<')
+        texts = [t.text for t in root.findall(self.NS + 'text')]
+        # Labels come first, then the cells in row-major order.
+        self.assertEqual(['0', '1', '-', '<'], texts[-4:])
+
+    def test_geometry_matches_latex(self):
+        geometry = karnaughgen.LaTeXGenerator.cube_geometry('1111')
+        self.assertEqual([(35, 15, 8, 8, '')], geometry)
+        # The map is 40 units high with its top left corner at the margin,
+        # so the cell of 1111 (third row and column) starts at 21 + margin.
+        m = karnaughgen.SVGGenerator.MARGIN
+        self.assertEqual([(m + 21, m + 21, 8, 8)],
+                         self.implicants(self.parse(['1111'], '0' * 16)))
+
+    def test_wraps(self):
+        self.assertEqual(4, len(self.implicants(self.parse(['B0B0'],
+                                                           '0' * 16))))
+        self.assertEqual(2, len(self.implicants(self.parse(['1B0'],
+                                                           '0' * 8))))
+
+    def test_submaps(self):
+        root = self.parse(['1BB11'], '0' * 32)
+        clip = root.find(self.NS + 'clipPath')
+        self.assertEqual(2, len(clip.findall(self.NS + 'rect')))
+        texts = [t.text for t in root.findall(self.NS + 'text')]
+        self.assertIn('x1 = 1', texts)
+        self.assertEqual(32, texts.count('0'))
+        # The right-hand submap is 60 units to the right.
+        m = karnaughgen.SVGGenerator.MARGIN
+        self.assertEqual([(m + 81, m + 1, 8, 38)], self.implicants(root))
+        self.assertEqual(4, len(self.parse(['000000'], '0' * 64).findall(
+            self.NS + 'clipPath/' + self.NS + 'rect')))
+
+    def test_invalid(self):
+        self.assertRaises(karnaughgen.KarnaughError,
+                          karnaughgen.SVGGenerator.generate, ['01'], '0' * 8)
+
+
+class TestMinimizer(unittest.TestCase):
+
+    def minimize(self, values):
+        return [str(c) for c in karnaughgen.Minimizer.minimize(values)]
+
+    def test_constant(self):
+        self.assertEqual([], self.minimize('0000'))
+        self.assertEqual(['BB'], self.minimize('1111'))
+        self.assertEqual(['BBB'], self.minimize('1-1-1111'))
+
+    def test_dont_cares(self):
+        self.assertEqual(['0BBB', 'B111'], self.minimize('-1-11-1-00000001'))
+
+    def test_corners(self):
+        self.assertEqual(['B0B0'], self.minimize('1010000010100000'))
+
+    def test_cyclic(self):
+        # A cyclic function without essential primes.
+        cover = self.minimize('11100111')
+        self.assertEqual(3, len(cover))
+
+    def test_cover_is_valid(self):
+        values = '1101011101101001'
+        cover = karnaughgen.Minimizer.minimize(values)
+        covered = set(m for c in cover for m in c.minterms())
+        self.assertTrue(all(values[m] == '1' for m in covered))
+        self.assertEqual(set(i for i, v in enumerate(values) if v == '1'),
+                         covered)
+
+    def test_large_cyclic_core(self):
+        # 38 primes; an exhaustive cover search took seconds here.
+        values = ('01-110-11111-110110010111000011110100101110-01-0-0-'
+                  '0101001011111')
+        start = time.time()
+        cover = karnaughgen.Minimizer.minimize(values)
+        karnaughgen.CoverVerifier.verify(cover, values)
+        self.assertLess(time.time() - start, 0.5)
+        self.assertEqual((13, 55), (len(cover),
+                                    sum(c.literals() for c in cover)))
+
+    def test_prime_implicants(self):
+        primes = karnaughgen.Minimizer.prime_implicants(3, [0, 1, 2, 5, 6, 7])
+        self.assertEqual(sorted(['00B', '0B0', 'B01', 'B10', '1B1', '11B']),
+                         sorted(str(c) for c in primes))
+
+    def test_invalid_values(self):
+        for values in ['01', '010', '0120', '0' * 128]:
+            self.assertRaises(karnaughgen.KarnaughError,
+                              karnaughgen.Minimizer.minimize, values)
+
+    def test_latex_generator_empty_cover(self):
+        expected = ('\\begin{picture}(60,60)(0,0)\n'
+                    '\\put(0,10){\n'
+                    '\\Karnaughdiagram{2}{0000}'
+                    '($x_1$, $x_2$)[$f$]\n'
+                    '}\n'
+                    '\\end{picture}\n')
+        self.assertEqual(expected,
+                         karnaughgen.LaTeXGenerator.generate([], '0000'))
+
+
+class TestTimings(unittest.TestCase):
+
+    def test_phases(self):
+        self.assertIsNone(karnaughgen.LaTeXGenerator.timings)
+        with karnaughgen.Timings() as timings:
+            self.assertIs(timings, karnaughgen.LaTeXGenerator.timings)
+            latex = karnaughgen.LaTeXGenerator.generate(['BB1B', 'B01B'],
+                                                        '0' * 16)
+            karnaughgen.LaTeXGenerator.generate_cube('01')
+        self.assertIsNone(karnaughgen.LaTeXGenerator.timings)
+        self.assertEqual(latex, karnaughgen.LaTeXGenerator.generate(
+            ['BB1B', 'B01B'], '0' * 16))
+        summary = timings.summary()
+        self.assertEqual({'validate': 1, 'header': 1, 'cube': 3, 'footer': 1,
+                          'join': 1, 'generate': 1},
+                         dict((p, s['calls']) for p, s in summary.items()))
+        self.assertIn('1 maps in', timings.report())
+
+    def test_generate_into(self):
+        with karnaughgen.Timings() as timings:
+            karnaughgen.LaTeXGenerator.generate_into(io.StringIO(), ['01'],
+                                                     '0000')
+        self.assertEqual(['cube', 'footer', 'generate', 'header',
+                          'validate'], sorted(timings.summary()))
+
+    def test_callback(self):
+        records = []
+        timings = karnaughgen.Timings(lambda *r: records.append(r))
+        for seconds in [0.3, 0.1, 0.2, 0.4]:
+            timings.record('parse', seconds)
+        self.assertEqual(4, len(records))
+        stats = timings.summary()['parse']
+        self.assertEqual(4, stats['calls'])
+        self.assertAlmostEqual(1.0, stats['total'])
+        self.assertEqual((0.2, 0.4, 0.4),
+                         (stats['p50'], stats['p90'], stats['p99']))
+
+
+class TestRenderCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = karnaughgen.LaTeXGenerator.enable_cache(2)
+
+    def tearDown(self):
+        karnaughgen.LaTeXGenerator.disable_cache()
+
+    def test_hits_and_misses(self):
+        generate = karnaughgen.LaTeXGenerator.generate
+        first = generate(['BB1B', 'B01B'], '0' * 16)
+        second = generate([karnaughgen.Cube.parse('BB1B'), 'B01B'], '0' * 16)
+        self.assertEqual(first, second)
+        self.assertEqual(1, self.cache.stats.hits)
+        self.assertEqual(1, self.cache.stats.misses)
+        self.assertEqual(len(first), self.cache.stats.bytes)
+
+    def test_table_key(self):
+        generate = karnaughgen.LaTeXGenerator.generate
+        table = karnaughgen.TruthTable.parse('-1-11-1-00000001')
+        first = generate(['0BBB'], table)
+        self.assertEqual(first, generate(['0BBB'], '-1-11-1-00000001'))
+        self.assertEqual(1, self.cache.stats.hits)
+        key = (4, table.ones, table.dontcares, (karnaughgen.Cube.parse(
+            '0BBB'),))
+        self.assertEqual(first, self.cache.get(key))
+
+    def test_other_characters(self):
+        # Values are drawn as given, with or without a cache.
+        generate = karnaughgen.LaTeXGenerator.generate
+        expected = ''.join(karnaughgen.LaTeXGenerator.generate_chunks(
+            ['01'], '01x0'))
+        self.assertIn('{01x0}', expected)
+        self.assertEqual(expected, generate(['01'], '01x0'))
+        self.assertEqual(expected, generate(['01'], '01x0'))
+        self.assertEqual(1, self.cache.stats.hits)
+        self.assertNotEqual(expected, generate(['01'], '01-0'))
+
+    def test_order_is_kept(self):
+        generate = karnaughgen.LaTeXGenerator.generate
+        first = generate(['BB1B', 'B01B'], '0' * 16)
+        second = generate(['B01B', 'BB1B'], '0' * 16)
+        self.assertNotEqual(first, second)
+        self.assertEqual(2, self.cache.stats.misses)
+
+    def test_eviction(self):
+        generate = karnaughgen.LaTeXGenerator.generate
+        for cube in ['00', '01', '10', '00']:
+            generate([cube], '0000')
+        self.assertEqual(2, len(self.cache))
+        self.assertEqual(2, self.cache.stats.evictions)
+        self.assertEqual(0, self.cache.stats.hits)
+
+    def test_lru_order(self):
+        self.cache.put('a', 'x')
+        self.cache.put('b', 'y')
+        self.cache.get('a')
+        self.cache.put('c', 'z')
+        self.assertEqual('x', self.cache.get('a'))
+        self.assertIsNone(self.cache.get('b'))
+
+    def test_clear(self):
+        karnaughgen.LaTeXGenerator.generate(['00'], '0000')
+        self.cache.clear()
+        self.assertEqual(0, len(self.cache))
+        self.assertEqual(0, self.cache.stats.bytes)
+
+    def test_invalid_size(self):
+        self.assertRaises(karnaughgen.KarnaughError,
+                          karnaughgen.RenderCache, 0)
+
+
+class TestDiskCache(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.cache = karnaughgen.DiskCache(self.path)
+        karnaughgen.LaTeXGenerator.cache = self.cache
+
+    def tearDown(self):
+        karnaughgen.LaTeXGenerator.disable_cache()
+        shutil.rmtree(self.path)
+
+    def test_hits_and_misses(self):
+        generate = karnaughgen.LaTeXGenerator.generate
+        first = generate(['BB1B', 'B01B'], '0' * 16)
+        self.assertEqual(first, generate(['BB1B', 'B01B'], '0' * 16))
+        self.assertEqual(1, self.cache.stats.hits)
+        self.assertEqual(1, self.cache.stats.misses)
+        # A fresh cache over the same directory reuses the stored code.
+        other = karnaughgen.DiskCache(self.path)
+        key = (4, 0, 0, tuple(karnaughgen.Cube.parse(c)
+                              for c in ['BB1B', 'B01B']))
+        self.assertEqual(first, other.get(key))
+
+    def test_other_characters(self):
+        generate = karnaughgen.LaTeXGenerator.generate
+        first = generate(['01'], '01x0')
+        self.assertEqual(first, generate(['01'], '01x0'))
+        self.assertEqual(1, self.cache.stats.hits)
+        self.assertNotEqual(first, generate(['01'], '01-0'))
+
+    def test_digest(self):
+        key = (2, 0, 0, (karnaughgen.Cube.parse('01'),))
+        other = (2, 0b1000, 0, (karnaughgen.Cube.parse('01'),))
+        self.assertEqual(karnaughgen.DiskCache.digest(key),
+                         karnaughgen.DiskCache.digest(key))
+        self.assertNotEqual(karnaughgen.DiskCache.digest(key),
+                            karnaughgen.DiskCache.digest(other))
+
+    def test_bytes(self):
+        # Sizes are counted on disk, also of code that is not ASCII, and
+        # replacing a file only counts the new one.
+        key = (2, 0, 0, (karnaughgen.Cube.parse('00'),))
+        self.cache.put(key, u'\u00e5\n')
+        filename = self.cache._filename(key)
+        self.assertEqual(os.path.getsize(filename), self.cache.stats.bytes)
+        self.cache.put(key, u'code\n')
+        self.assertEqual(os.path.getsize(filename), self.cache.stats.bytes)
+        self.cache.evict()
+        self.assertEqual(os.path.getsize(filename), self.cache.stats.bytes)
+
+    def test_eviction(self):
+        self.cache.maxbytes = 1
+        karnaughgen.LaTeXGenerator.generate(['00'], '0000')
+        self.assertEqual(1, self.cache.stats.evictions)
+        self.assertEqual(0, self.cache.stats.bytes)
+
+    def test_unwritable(self):
+        # A directory that cannot be created only gives misses.
+        filename = os.path.join(self.path, 'file')
+        io.open(filename, 'w').close()
+        cache = karnaughgen.DiskCache(os.path.join(filename, 'cache'))
+        karnaughgen.LaTeXGenerator.cache = cache
+        code = karnaughgen.LaTeXGenerator.generate(['00'], '0000')
+        self.assertEqual(code, karnaughgen.LaTeXGenerator.generate(['00'],
+                                                                  '0000'))
+        self.assertEqual(2, cache.stats.misses)
+
+    def test_clear(self):
+        karnaughgen.LaTeXGenerator.generate(['00'], '0000')
+        self.cache.clear()
+        key = (2, 0, 0, (karnaughgen.Cube.parse('00'),))
+        self.assertIsNone(self.cache.get(key))
+
+
+class TestBatchRenderer(unittest.TestCase):
+
+    JOBS = ['{"values": "0000", "cubes": ["01", "BB"], "id": 7}\n',
+            '{"values": "-1-11-1-00000001", "minimize": true}\n',
+            '\n',
+            'not json\n',
+            '{"values": "000", "cubes": "01"}\n']
+
+    def test_read(self):
+        lines = list(karnaughgen.BatchRenderer.read(self.JOBS))
+        self.assertEqual([1, 2, 4, 5], [n for n, _ in lines])
+        csv_lines = ['values,cubes\n', '0000,01 BB\n']
+        self.assertEqual([(2, '0000,01 BB\n')],
+                         list(karnaughgen.BatchRenderer.read(csv_lines,
+                                                             'csv')))
+
+    def test_render(self):
+        render = karnaughgen.BatchRenderer.render
+        result = render(1, self.JOBS[0])
+        self.assertEqual(7, result['id'])
+        self.assertEqual(karnaughgen.LaTeXGenerator.generate(['01', 'BB'],
+                                                             '0000'),
+                         result['latex'])
+        result = render(2, self.JOBS[1])
+        self.assertEqual(karnaughgen.LaTeXGenerator.generate(
+            ['0BBB', 'B111'], '-1-11-1-00000001'), result['latex'])
+        self.assertEqual(result, render(2, '-1-11-1-00000001,', 'csv', True))
+        self.assertIn('error', render(4, self.JOBS[3]))
+        self.assertEqual({'line': 5,
+                          'error': 'Invalid length of input values.'},
+                         render(5, self.JOBS[4]))
+
+    def test_malformed(self):
+        render = karnaughgen.BatchRenderer.render
+        nested = '[' * 100000 + ']' * 100000
+        jobs = [('{"values": "0000", "cubes": [[0, 1]]}',
+                 'Invalid job cubes.'),
+                ('{"values": 5}', 'Invalid job values.'),
+                ('{"values": {"0110": 1}}', 'Invalid job values.'),
+                ('{"values_hex": 5}', 'Invalid job values_hex.'),
+                ('{"expr": ["x1"]}', 'Invalid job expr.')]
+        for line, error in jobs:
+            self.assertEqual({'line': 1, 'error': error}, render(1, line))
+        self.assertIn('error', render(1, '{"values": ' + nested + '}'))
+        lines = list(enumerate([line for line, _ in jobs], 1))
+        results = karnaughgen.BatchRenderer.run(lines, jobs=2, ordered=False,
+                                                chunksize=2)
+        self.assertEqual([error for _, error in jobs],
+                         [r['error'] for r in sorted(
+                             results, key=lambda r: r['line'])])
+
+    def test_render_into(self):
+        writer = io.StringIO()
+        result = karnaughgen.BatchRenderer.render(1, self.JOBS[0],
+                                                  writer=writer)
+        self.assertEqual({'line': 1, 'id': 7}, result)
+        self.assertEqual(karnaughgen.LaTeXGenerator.generate(['01', 'BB'],
+                                                             '0000'),
+                         writer.getvalue())
+
+    def test_run(self):
+        lines = [(n, '{{"values": "{:04b}", "minimize": true}}'.format(n))
+                 for n in range(16)]
+        run = karnaughgen.BatchRenderer.run
+        expected = list(run(lines))
+        self.assertEqual(list(range(16)), [r['line'] for r in expected])
+        self.assertEqual(expected, list(run(lines, jobs=2, chunksize=3)))
+        unordered = run(lines, jobs=2, ordered=False, chunksize=3)
+        self.assertEqual(expected, sorted(unordered, key=lambda r: r['line']))
+
+
+class TestDocumentAssembler(unittest.TestCase):
+
+    def results(self):
+        jobs = ['{"values": "0110", "minimize": true, "caption": "XOR", '
+                '"label": "fig:xor"}',
+                '{"values": "0111", "minimize": true}',
+                '{"values": "1111", "cubes": ["BB"]}']
+        return list(karnaughgen.BatchRenderer.run(enumerate(jobs, 1)))
+
+    def test_assemble(self):
+        results = self.results()
+        writer = io.StringIO()
+        karnaughgen.DocumentAssembler(columns=2).assemble(results, writer)
+        document = writer.getvalue()
+        self.assertTrue(document.startswith('\\documentclass{article}\n'))
+        self.assertTrue(document.endswith('\\end{document}\n'))
+        self.assertEqual(1, document.count('\\usepackage{Karnaugh}'))
+        self.assertEqual(3, document.count('\\begin{minipage}'))
+        # One row break for three maps in two columns.
+        self.assertEqual(1, document.count('\\medskip'))
+        self.assertIn('\\captionof{figure}{XOR}\n\\label{fig:xor}\n',
+                      document)
+        positions = [document.index(r['latex']) for r in results]
+        self.assertEqual(sorted(positions), positions)
+
+    def test_error(self):
+        results = self.results()
+        results.insert(2, {'line': 4, 'error': 'Job has no values.'})
+        writer = io.StringIO()
+        self.assertRaises(karnaughgen.KarnaughError,
+                          karnaughgen.DocumentAssembler().assemble,
+                          iter(results), writer)
+        # Nothing is written of a document that would be truncated.
+        self.assertEqual('', writer.getvalue())
+
+
+class TestCoverVerifier(unittest.TestCase):
+
+    def verify(self, cubes, values):
+        return karnaughgen.CoverVerifier.verify(cubes, values)
+
+    def test_minimal(self):
+        report = self.verify(['B1B', '1BB'], '00111111')
+        self.assertTrue(report.valid)
+        self.assertTrue(report.minimal)
+        self.assertTrue(self.verify([], '0000').minimal)
+
+    def test_uncovered_and_zeros(self):
+        report = self.verify(['B1B', '1B1'], '00101111')
+        self.assertFalse(report.valid)
+        self.assertEqual([4], report.uncovered)
+        self.assertEqual({karnaughgen.Cube.parse('B1B'): [3]}, report.zeros)
+        self.assertFalse(report.minimal)
+
+    def test_redundant_and_nonprime(self):
+        report = self.verify(['11B', '1B1', '101'], '00000111')
+        self.assertTrue(report.valid)
+        # Each of 1B1 and 101 is covered by the other cubes.
+        self.assertEqual(['1B1', '101'], [str(c) for c in report.redundant])
+        self.assertEqual(['101'], [str(c) for c in report.nonprime])
+        self.assertFalse(report.minimal)
+
+    def test_dont_cares(self):
+        # Don't cares may be covered, and allow cubes to be prime.
+        report = self.verify(['1BBB'], '0000-0001111-111')
+        self.assertTrue(report.valid)
+        self.assertEqual([], report.nonprime)
+        self.assertFalse(self.verify(['11BB'], '00000000-1-11111').minimal)
+
+    def test_matches_minimizer(self):
+        for values in ['0110', '-1-11-1-00000001', '1010000010100000',
+                       '0' * 31 + '1']:
+            cubes = karnaughgen.Minimizer.minimize(values)
+            self.assertTrue(self.verify(cubes, values).minimal)
+
+    def test_batch(self):
+        result = karnaughgen.BatchRenderer.render(
+            1, '{"values": "00101111", "cubes": "B1B 1B1"}', verify=True)
+        self.assertEqual({'valid': False, 'uncovered': [4],
+                          'zeros': {'B1B': [3]}, 'redundant': [],
+                          'nonprime': ['1B1'], 'minimal': False},
+                         result['report'])
+        self.assertNotIn('latex', result)
+
+    def test_invalid(self):
+        self.assertRaises(karnaughgen.KarnaughError, self.verify,
+                          ['01'], '01x0')
+        self.assertRaises(karnaughgen.KarnaughError, self.verify,
+                          ['011'], '0000')
+
+
+class TestMultiOutputMinimizer(unittest.TestCase):
+
+    # The segments a to g of a 7-segment decoder of the digits 0 to 9.
+    SEGMENTS = [[0, 2, 3, 5, 6, 7, 8, 9], [0, 1, 2, 3, 4, 7, 8, 9],
+                [0, 1, 3, 4, 5, 6, 7, 8, 9], [0, 2, 3, 5, 6, 8, 9],
+                [0, 2, 6, 8], [0, 4, 5, 6, 8, 9], [2, 3, 4, 5, 6, 8, 9]]
+
+    def setUp(self):
+        self.tables = [karnaughgen.TruthTable(4, sum(1 << m for m in ms),
+                                              0xfc00)
+                       for ms in self.SEGMENTS]
+
+    def test_covers(self):
+        minimizer = karnaughgen.MultiOutputMinimizer
+        covers = minimizer.minimize(self.tables)
+        separate = [karnaughgen.Minimizer.minimize(t) for t in self.tables]
+        for cover, table, single in zip(covers, self.tables, separate):
+            self.assertTrue(karnaughgen.CoverVerifier.verify(
+                cover, table).valid)
+            self.assertEqual(len(single), len(cover))
+        # Sharing needs fewer distinct cubes than minimizing separately.
+        self.assertLess(len(set(c for cover in covers for c in cover)),
+                        len(set(c for cover in separate for c in cover)))
+        self.assertEqual(['1BBB', 'B01B', 'B1B0', 'B000', 'B101'],
+                         [str(c) for c in minimizer.shared(covers)])
+        self.assertEqual(covers, minimizer.minimize(self.tables, jobs=2))
+
+    def test_prime_implicants(self):
+        primes = karnaughgen.MultiOutputMinimizer.prime_implicants(
+            [karnaughgen.TruthTable.parse('0111'),
+             karnaughgen.TruthTable.parse('0001')])
+        self.assertEqual([('11', 3), ('B1', 1), ('1B', 1)],
+                         [(str(c), tag) for c, tag in primes])
+        # A single output gives the primes of Minimizer.
+        table = karnaughgen.TruthTable.parse('-1-11-1-00000001')
+        primes = karnaughgen.MultiOutputMinimizer.prime_implicants([table])
+        self.assertEqual(
+            sorted(karnaughgen.Minimizer.prime_implicants(
+                4, *karnaughgen.Minimizer.parse_values(table)[1:]),
+                key=str),
+            sorted((c for c, _ in primes), key=str))
+
+    def test_generate(self):
+        minimizer = karnaughgen.MultiOutputMinimizer
+        tables = [karnaughgen.TruthTable.parse('0111'),
+                  karnaughgen.TruthTable.parse('0001')]
+        covers = minimizer.minimize(tables)
+        self.assertEqual([['B1', '1B'], ['11']],
+                         [[str(c) for c in cover] for cover in covers])
+        self.assertEqual([], minimizer.shared(covers))
+        codes = minimizer.generate(covers, tables)
+        self.assertEqual(karnaughgen.LaTeXGenerator.generate(covers[1],
+                                                             tables[1]),
+                         codes[1])
+        tables[1] = karnaughgen.TruthTable.parse('0011')
+        covers = minimizer.minimize(tables)
+        self.assertEqual(['1B'], [str(c) for c in minimizer.shared(covers)])
+        code = minimizer.generate(covers, tables)[0]
+        self.assertIn('{\\thicklines' +
+                      karnaughgen.LaTeXGenerator.generate_cube('1B') + '}',
+                      code)
+
+    def test_colors(self):
+        minimizer = karnaughgen.MultiOutputMinimizer
+        ns = '{http://www.w3.org/2000/svg}'
+        covers = [[karnaughgen.Cube.parse(c) for c in cover]
+                  for cover in [['1B', 'B1'], ['B1'], ['1B']]]
+        shared = minimizer.shared(covers)
+        strokes = {}
+        for cover in covers:
+            cubes = minimizer.order(cover, shared)
+            colors = minimizer.colors(cubes, shared)
+            root = xml.etree.ElementTree.fromstring(
+                karnaughgen.SVGGenerator.generate(cubes, '0111', colors))
+            rects = root.find(ns + 'g').findall(ns + 'rect')
+            for cube, rect in zip(cubes, rects):
+                strokes.setdefault(cube, set()).add(rect.get('stroke'))
+        # Each shared cube has one color in all maps, and they differ.
+        self.assertEqual([1, 1], [len(strokes[c]) for c in shared])
+        self.assertNotEqual(strokes[shared[0]], strokes[shared[1]])
+        self.assertEqual([0, 1, 2], minimizer.colors(
+            [shared[0], shared[1], karnaughgen.Cube.parse('11')], shared))
+        self.assertRaises(karnaughgen.KarnaughError,
+                          karnaughgen.SVGGenerator.generate, ['1B'], '0111',
+                          [0, 1])
+
+    def test_invalid(self):
+        self.assertRaises(karnaughgen.KarnaughError,
+                          karnaughgen.MultiOutputMinimizer.minimize, [])
+        self.assertRaises(karnaughgen.KarnaughError,
+                          karnaughgen.MultiOutputMinimizer.minimize,
+                          ['0110', '01100110'])
+
+
+class TestHeuristicMinimizer(unittest.TestCase):
+
+    def test_small(self):
+        for values in ['0110', '-1-11-1-00000001', '1010000010100000',
+                       '11100111', '0' * 31 + '1', '0000']:
+            table = karnaughgen.TruthTable.parse(values)
+            cover = karnaughgen.HeuristicMinimizer.minimize(
+                table.variables, table.ones, table.dontcares)
+            self.assertTrue(karnaughgen.CoverVerifier.verify(
+                cover, values).valid)
+        # The corners of a 4-variable map are a single cube.
+        self.assertEqual(['B0B0'], [str(c) for c in
+                                    karnaughgen.HeuristicMinimizer.minimize(
+                                        4, 0b0000010100000101)])
+
+    def test_wide(self):
+        random = __import__('random').Random(2)
+        variables = 12
+        cubes = []
+        for _ in range(30):
+            care = random.getrandbits(variables)
+            cubes.append(karnaughgen.Cube(variables,
+                                          random.getrandbits(variables),
+                                          care))
+        ones = 0
+        for cube in cubes:
+            ones |= cube.mask()
+        cover = karnaughgen.HeuristicMinimizer.minimize(variables, ones,
+                                                        cover=cubes)
+        self.assertLessEqual(len(cover), len(cubes))
+        covered = 0
+        for cube in cover:
+            covered |= cube.mask()
+        self.assertEqual(ones, covered)
+
+    def test_project(self):
+        minimize = karnaughgen.HeuristicMinimizer.minimize
+        project = karnaughgen.HeuristicMinimizer.project
+        # f = x1 x6 + x2' x3 on 6 variables.
+        x1x6 = karnaughgen.Cube(6, 0b100001, 0b100001)
+        x2x3 = karnaughgen.Cube(6, 0b001000, 0b011000)
+        cover = minimize(6, x1x6.mask() | x2x3.mask())
+        self.assertEqual(sorted([x1x6, x2x3], key=str),
+                         sorted(cover, key=str))
+        values = (6, x1x6.mask() | x2x3.mask(), 0)
+        # With x1 = 1 and x2 = 0, the map of x3 to x6 is x3 + x6.
+        cubes, valstr = project(cover, values, [3, 4, 5, 6], {1: 1, 2: 0})
+        self.assertEqual(['1BBB', 'BBB1'], sorted(str(c) for c in cubes))
+        self.assertEqual('0101010111111111', valstr)
+        self.assertTrue(karnaughgen.CoverVerifier.verify(cubes,
+                                                         valstr).minimal)
+        # The order of the map variables is that of the map.
+        cubes, valstr = project(cover, values, [6, 5, 4, 3], {1: 0, 2: 0})
+        self.assertEqual(['BBB1'], [str(c) for c in cubes])
+        self.assertEqual('01' * 8, valstr)
+
+    def test_invalid(self):
+        minimize = karnaughgen.HeuristicMinimizer.minimize
+        project = karnaughgen.HeuristicMinimizer.project
+        self.assertRaises(karnaughgen.KarnaughError, minimize, 13, 1)
+        self.assertRaises(karnaughgen.KarnaughError, minimize, 4, 1,
+                          cover=[karnaughgen.Cube.parse('000B')])
+        self.assertRaises(karnaughgen.KarnaughError, project, [],
+                          (6, 0, 0), [1, 2, 3, 4], {5: 0})
+        self.assertRaises(karnaughgen.KarnaughError, project, [],
+                          (6, 0, 0), [1, 2, 3, 4], {5: 0, 6: 2})
+
+
+class TestPrimeTracker(unittest.TestCase):
+
+    def test_incremental(self):
+        random = __import__('random').Random(5)
+        for variables in [2, 4, 6]:
+            values = ['0'] * 2 ** variables
+            tracker = karnaughgen.PrimeTracker(''.join(values))
+            for _ in range(50):
+                minterm = random.randrange(len(values))
+                values[minterm] = random.choice('01-')
+                tracker.set(minterm, values[minterm])
+                fresh = karnaughgen.PrimeTracker(''.join(values))
+                self.assertEqual(fresh.primes(), tracker.primes())
+                self.assertEqual(''.join(values), str(tracker.table()))
+
+    def test_essentials(self):
+        tracker = karnaughgen.PrimeTracker('00000111')
+        self.assertEqual(['1B1', '11B'],
+                         [str(c) for c in tracker.essentials()])
+        # Each of the primes alone covers one of 011, 101 and 110.
+        tracker.set(0b011, '1')
+        self.assertEqual(['B11', '1B1', '11B'],
+                         [str(c) for c in tracker.essentials()])
+        # Minterm 011 as don't care leaves B11 without ones of its own.
+        tracker.set(0b011, '-')
+        self.assertEqual(['B11', '1B1', '11B'],
+                         [str(c) for c in tracker.primes()])
+        self.assertEqual(['1B1', '11B'],
+                         [str(c) for c in tracker.essentials()])
+
+    def test_suggestion(self):
+        for values in ['0110', '-1-11-1-00000001', '1010000010100000',
+                       '11100111']:
+            tracker = karnaughgen.PrimeTracker(values)
+            suggestion = tracker.suggestion()
+            self.assertTrue(karnaughgen.CoverVerifier.verify(
+                suggestion, values).valid)
+        self.assertEqual([], karnaughgen.PrimeTracker('0000').suggestion())
+
+    def test_invalid(self):
+        tracker = karnaughgen.PrimeTracker('0000')
+        self.assertRaises(karnaughgen.KarnaughError, tracker.set, 4, '1')
+        self.assertRaises(karnaughgen.KarnaughError, tracker.set, 0, 'x')
+
+
+class TestPLA(unittest.TestCase):
+
+    PLA = (b'# comparator\n'
+           b'.i 4\n.o 3\n'
+           b'.ilb a1 a0 b1 b0\n'
+           b'.ob gt eq lt\n'
+           b'.p 5\n'
+           b'1-0- 100\n'
+           b'-100 100\n'
+           b'0000 010\n'
+           b'1111 01-\n'
+           b'0-1- 001\n'
+           b'.e\n')
+
+    def read(self, content):
+        fd, path = tempfile.mkstemp(suffix='.pla')
+        try:
+            os.write(fd, content)
+            os.close(fd)
+            return karnaughgen.PLA.read(path)
+        finally:
+            os.remove(path)
+
+    def test_read(self):
+        pla = self.read(self.PLA)
+        self.assertEqual(4, pla.inputs)
+        self.assertEqual(['gt', 'eq', 'lt'], pla.names)
+        self.assertEqual(['a1', 'a0', 'b1', 'b0'], pla.input_names)
+        maps = [(name, [str(c) for c in cubes], str(values))
+                for name, cubes, values in pla.maps()]
+        self.assertEqual([('gt', ['1B0B', 'B100'], '0000100011001100'),
+                          ('eq', ['0000', '1111'], '1000000000000001'),
+                          ('lt', ['0B1B'], '001100110000000-')], maps)
+        stream = karnaughgen.PLA.read(io.StringIO(self.PLA.decode('ascii')))
+        self.assertEqual(pla.onsets, stream.onsets)
+        self.assertEqual(pla.dontcares, stream.dontcares)
+
+    def test_outputs(self):
+        pla = self.read(self.PLA)
+        maps = list(pla.maps(['lt', 0], minimize=True))
+        self.assertEqual(['lt', 'gt'], [name for name, _, _ in maps])
+        for name, cubes, values in maps:
+            self.assertTrue(karnaughgen.CoverVerifier.verify(
+                cubes, values).minimal)
+        self.assertRaises(karnaughgen.KarnaughError, list, pla.maps(['ne']))
+
+    def test_types(self):
+        body = b'.i 2\n.o 1\n11 1\n00 0\n01 -\n'
+        values = next(self.read(b'.type f\n' + body).maps())[2]
+        self.assertEqual('0001', str(values))
+        # The default type is fd.
+        values = next(self.read(body).maps())[2]
+        self.assertEqual('0-01', str(values))
+        values = next(self.read(b'.type fr\n' + body).maps())[2]
+        self.assertEqual('0--1', str(values))
+        values = next(self.read(b'.type fdr\n' + body).maps())[2]
+        self.assertEqual('0--1', str(values))
+
+    def test_wide(self):
+        rows = [b'.i 8', b'.o 1']
+        rows += [format(m, '08b').encode() + b' 1'
+                 for m in range(0, 256, 3)]
+        pla = self.read(b'\n'.join(rows) + b'\n')
+        self.assertEqual(sum(1 << m for m in range(0, 256, 3)),
+                         pla.onsets[0])
+        self.assertRaises(karnaughgen.KarnaughError, list, pla.maps())
+        cover = karnaughgen.HeuristicMinimizer.minimize(
+            8, pla.onsets[0], pla.dontcares[0], pla.cubes[0])
+        self.assertLessEqual(len(cover), len(pla.cubes[0]))
+
+    def test_submaps(self):
+        rows = [b'.i 6', b'.o 1', b'.ilb a b c d e f']
+        rows += [format(m, '06b').encode() + b' 1' for m in range(0, 64, 3)]
+        pla = self.read(b'\n'.join(rows) + b'\n')
+        table = karnaughgen.TruthTable(6, pla.onsets[0])
+        for minimize in [False, True]:
+            submaps = list(pla.submaps(['c', 'x4', 5, 'f'],
+                                       {'a': 1, 'x2': '0'},
+                                       minimize=minimize))
+            self.assertEqual(1, len(submaps))
+            name, cubes, values = submaps[0]
+            self.assertEqual('f1', name)
+            # The submap of x1 = 1 and x2 = 0 is the third quarter.
+            self.assertEqual(str(table)[32:48], values)
+            self.assertTrue(karnaughgen.CoverVerifier.verify(
+                cubes, values).valid)
+        self.assertRaises(karnaughgen.KarnaughError, list,
+                          pla.submaps(['c', 'd', 'e', 'g'], {'a': 1, 'b': 0}))
+        self.assertRaises(karnaughgen.KarnaughError, list,
+                          pla.submaps(['c', 'd', 'e', 'f'], {'a': 2, 'b': 0}))
+        self.assertRaises(karnaughgen.KarnaughError, list,
+                          pla.submaps(['c', 'd', 'e', 'f'], {'a': 1}))
+        # Files wider than HeuristicMinimizer.MAX_VARIABLES are drawn, but
+        # cannot be minimized.
+        rows = [b'.i 13', b'.o 1', b'1' * 13 + b' 1']
+        pla = self.read(b'\n'.join(rows) + b'\n')
+        assignment = dict(('x{}'.format(i), 1) for i in range(5, 14))
+        name, cubes, values = next(pla.submaps([1, 2, 3, 4], assignment))
+        self.assertEqual(['1111'], [str(c) for c in cubes])
+        self.assertRaises(karnaughgen.KarnaughError, list,
+                          pla.submaps([1, 2, 3, 4], assignment,
+                                      minimize=True))
+
+    def test_invalid(self):
+        for content in [b'', b'11 1\n', b'.i 2\n.o 1\n111 1\n',
+                        b'.i 2\n.o 1\n1x 1\n', b'.i 2\n.o 1\n11 x\n',
+                        b'.i 2\n.o 2\n.ob f\n11 11\n', b'.i x\n',
+                        b'.i 2\n.o 1\n.ilb a\n11 1\n',
+                        b'.type q\n', b'.mv 3 1\n']:
+            self.assertRaises(karnaughgen.KarnaughError, self.read, content)
+
+
+class TestCoverTable(unittest.TestCase):
+
+    def setUp(self):
+        self.table = karnaughgen.CoverTable.default()
+        if self.table is None:
+            self.skipTest('cover table has not been built')
+
+    def test_lookup_matches_minimizer(self):
+        for index in range(0, 2 ** 16, 97):
+            ones = [m for m in range(16) if index >> m & 1]
+            primes = karnaughgen.Minimizer.prime_implicants(4, ones)
+            self.assertEqual(karnaughgen.Minimizer.minimal_cover(primes, ones),
+                             self.table.lookup(index))
+
+    def test_minimize_uses_table(self):
+        values = '1010000010100000'
+        index = karnaughgen.Cube.parse('B0B0').mask()
+        self.assertEqual(self.table.lookup(index),
+                         karnaughgen.Minimizer.minimize(values))
+
+    def test_encode(self):
+        cubes = [karnaughgen.Cube.parse(c) for c in ['BBBB', '1111', '0B1B']]
+        record = karnaughgen.CoverTable.encode(cubes)
+        self.assertEqual(karnaughgen.CoverTable.RECORD_SIZE, len(record))
+
+    def test_invalid_table(self):
+        fd, path = tempfile.mkstemp()
+        try:
+            os.write(fd, b'not a cover table')
+            os.close(fd)
+            self.assertRaises(karnaughgen.KarnaughError,
+                              karnaughgen.CoverTable, path)
+        finally:
+            os.remove(path)
+
+
+class TestRenderServer(unittest.TestCase):
+
+    JOBS = [b'{"values": "0110", "cubes": ["01", "10"]}',
+            b'{"values": "0000", "cubes": [[0, 1]]}',
+            b'{"values": ' + b'[' * 10000 + b']' * 10000 + b'}',
+            b'not json',
+            b'{"values": "-1-11-1-00000001", "minimize": true}']
+
+    def setUp(self):
+        if not hasattr(socket, 'AF_UNIX'):
+            self.skipTest('Unix sockets are not supported')
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'karnaughgen.sock')
+        self.cwd = os.path.dirname(os.path.abspath(__file__))
+        self.sockets = []
+        self.server = subprocess.Popen(
+            [sys.executable, 'karnaughgen-serve.py', '--socket', self.path],
+            cwd=self.cwd)
+        for _ in range(100):
+            if os.path.exists(self.path):
+                break
+            time.sleep(0.05)
+
+    def tearDown(self):
+        for sock in self.sockets:
+            sock.close()
+        self.server.terminate()
+        self.server.wait()
+        shutil.rmtree(self.directory)
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(30)
+        sock.connect(self.path)
+        self.sockets.append(sock)
+        return sock
+
+    def results(self, sock, count):
+        f = sock.makefile('rb')
+        return [json.loads(f.readline().decode('utf-8'))
+                for _ in range(count)]
+
+    def test_pipelined(self):
+        sock = self.connect()
+        sock.sendall(b'\n'.join(self.JOBS) + b'\n')
+        results = self.results(sock, len(self.JOBS))
+        self.assertEqual([1, 2, 3, 4, 5], [r['line'] for r in results])
+        self.assertEqual(karnaughgen.LaTeXGenerator.generate(
+            ['01', '10'], '0110'), results[0]['latex'])
+        for result in results[1:4]:
+            self.assertIn('error', result)
+        self.assertIn('latex', results[4])
+
+    def test_concurrent(self):
+        first, second = self.connect(), self.connect()
+        first.sendall(self.JOBS[4] + b'\n' + self.JOBS[0] + b'\n')
+        second.sendall(self.JOBS[0] + b'\n')
+        expected = karnaughgen.LaTeXGenerator.generate(['01', '10'], '0110')
+        self.assertEqual(expected, self.results(second, 1)[0]['latex'])
+        self.assertEqual(expected, self.results(first, 2)[1]['latex'])
+
+    def test_client(self):
+        args = [sys.executable, 'karnaughgen-client.py', '-v=0110', '01',
+                '10']
+        expected = subprocess.check_output(
+            [sys.executable, 'karnaughgen-cli.py'] + args[2:], cwd=self.cwd)
+        for path in [self.path, os.path.join(self.directory, 'none.sock')]:
+            env = dict(os.environ, KARNAUGHGEN_SOCKET=path)
+            self.assertEqual(expected, subprocess.check_output(
+                args, cwd=self.cwd, env=env))
+
+
+class TestStartup(unittest.TestCase):
+
+    # Budget for the import time of the modules imported when rendering a
+    # single map, beyond those imported by the interpreter itself, as a
+    # fraction of the import time of the latter. Both are measured together,
+    # so that the load of the machine affects both alike. This includes the
+    # body of the karnaughgen module, run from cached byte code.
+    IMPORT_BUDGET = 0.5
+    # The best of this many runs is compared with the budget.
+    RUNS = 5
+    # Modules that are slow to import and not needed for a single map.
+    SLOW_MODULES = ['argparse', 're', 'json', 'csv', 'hashlib', 'tempfile',
+                    'multiprocessing', 'threading', 'collections']
+
+    def setUp(self):
+        # Byte code is written to a temporary cache, also when
+        # PYTHONDONTWRITEBYTECODE is set, and not next to the sources.
+        self.cache = tempfile.mkdtemp()
+        self.env = dict(os.environ, PYTHONPYCACHEPREFIX=self.cache)
+        self.env.pop('PYTHONDONTWRITEBYTECODE', None)
+
+    def tearDown(self):
+        shutil.rmtree(self.cache)
+
+    def import_times(self, *args):
+        """Return a dict of module name to import time for the command."""
+        cmd = [sys.executable, '-X', 'importtime'] + list(args)
+        cwd = os.path.dirname(os.path.abspath(__file__))
+        output = subprocess.check_output(cmd, cwd=cwd, env=self.env,
+                                         stderr=subprocess.STDOUT)
+        times = {}
+        for line in output.decode('utf-8').splitlines():
+            if line.startswith('import time:') and '[us]' not in line:
+                self_time, _, name = line[len('import time:'):].split('|')
+                times[name.strip()] = int(self_time)
+        return times
+
+    def test_cli_import_budget(self):
+        # The first run fills the byte code cache.
+        self.import_times('karnaughgen-cli.py', '-v=0110', 'B1')
+        costs = []
+        for _ in range(self.RUNS):
+            interpreter = self.import_times('-c', 'pass')
+            times = self.import_times('karnaughgen-cli.py', '-v=0110', 'B1')
+            self.assertIn('karnaughgen', times)
+            for module in self.SLOW_MODULES:
+                if module not in interpreter:
+                    self.assertNotIn(module, times)
+            extra = sum(t for name, t in times.items()
+                        if name not in interpreter)
+            costs.append(float(extra) / sum(interpreter.values()))
+        self.assertLess(min(costs), self.IMPORT_BUDGET)
+
+
 if __name__ == '__main__':
     unittest.main()